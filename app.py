@@ -1,12 +1,12 @@
 import streamlit as st
-import torch
 import torchaudio
-import soundfile as sf
-from openvoice.api import BaseSpeakerTTS, ToneColorConverter 
+from openvoice.api import ToneColorConverter 
 import os
 import uuid
 import tempfile
-import requests
+from openvoice.assets import get_asset_manager
+from openvoice.registry import get_model_registry
+from openvoice.encoders import encode_audio
 
 os.makedirs("checkpoints/base_speakers/EN", exist_ok=True)
 os.makedirs("checkpoints/converter", exist_ok=True)
@@ -14,12 +14,16 @@ os.makedirs("checkpoints/converter", exist_ok=True)
 
 def download_if_missing(url, save_path):
     if not os.path.exists(save_path):
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
         print(f"⬇ Downloading {url} to {save_path}") 
-        r = requests.get(url)
-        r.raise_for_status()
-        with open(save_path, "wb") as f:
-            f.write(r.content)
+        get_asset_manager().fetch(url, save_path=save_path)
+
+
+def download_all_missing(files):
+    # Streams, resumes and verifies through the shared cache; files are fetched in parallel.
+    missing = [(url, save_path) for url, save_path in files if not os.path.exists(save_path)]
+    for url, save_path in missing:
+        print(f"⬇ Downloading {url} to {save_path}")
+    get_asset_manager().fetch_many(missing)
 
 
 # Hugging Face base path
@@ -31,72 +35,46 @@ CONVERTER_CKPT_URL = f"{CONVERTER_DIR}/checkpoint.pth"
 
 
 # Download checkpoints
-download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/converter/config.json", "checkpoints/converter/config.json")
-download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/converter/checkpoint.pth", "checkpoints/converter/checkpoint.pth")
-download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/config.json", "checkpoints/base_speakers/EN/config.json")
-download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/checkpoint.pth", "checkpoints/base_speakers/EN/checkpoint.pth")
-download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/en_default_se.pth", "checkpoints/base_speakers/EN/en_default_se.pth")
-download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/en_style_se.pth", "checkpoints/base_speakers/EN/en_style_se.pth")
-download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/imran_khan_se.pth", "checkpoints/base_speakers/EN/imran_khan_se.pth")
+download_all_missing([
+    (f"{HF_BASE}/converter/config.json", "checkpoints/converter/config.json"),
+    (f"{HF_BASE}/converter/checkpoint.pth", "checkpoints/converter/checkpoint.pth"),
+    (f"{HF_BASE}/base_speakers/EN/config.json", "checkpoints/base_speakers/EN/config.json"),
+    (f"{HF_BASE}/base_speakers/EN/checkpoint.pth", "checkpoints/base_speakers/EN/checkpoint.pth"),
+    (f"{HF_BASE}/base_speakers/EN/en_default_se.pth", "checkpoints/base_speakers/EN/en_default_se.pth"),
+    (f"{HF_BASE}/base_speakers/EN/en_style_se.pth", "checkpoints/base_speakers/EN/en_style_se.pth"),
+    (f"{HF_BASE}/base_speakers/EN/imran_khan_se.pth", "checkpoints/base_speakers/EN/imran_khan_se.pth"),
+])
 #download_if_missing("https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/new_imran.pth", "checkpoints/base_speakers/EN/new_imran.pth")
 
 
 @st.cache_resource
+def load_registry():
+    # Models and speaker embeddings load on first use; OPENVOICE_MODEL_MEMORY_MB caps what stays resident.
+    memory_mb = os.environ.get("OPENVOICE_MODEL_MEMORY_MB")
+    return get_model_registry(max_bytes=int(memory_mb) * 2 ** 20 if memory_mb else None)
 
-def load_models():
-    with st.spinner("Loading models..."):
-        # Load BaseSpeakerTTS
-        tts_model = BaseSpeakerTTS(f"{EN_DIR}/config.json", device="cpu")
-        tts_model.load_ckpt(f"{EN_DIR}/checkpoint.pth")
-
-        
-        # Load the ToneColorConverter
-        converter = ToneColorConverter(CONVERTER_CONFIG_URL, device="cpu")
-        setattr(converter, 'enable_watermark', False)  # 💡 override after init without passing to __init__
-        converter.load_ckpt(CONVERTER_CKPT_URL)
-
-
-       # Load speaker embeddings
-        # File path and URL
-        default_se_path = "checkpoints/base_speakers/EN/en_default_se.pth"
-        default_se_url = "https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/en_default_se.pth"
-
-        # Download if missing
-        download_if_missing(default_se_url, default_se_path)
-
-        # Now safe to load
-        default_se = torch.load(default_se_path, map_location="cpu")
-
-        style_se_path = "checkpoints/base_speakers/EN/en_style_se.pth"
-        style_se_url = "https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/en_style_se.pth"
 
-        download_if_missing(style_se_url, style_se_path)
+def load_converter(registry):
+    converter = registry.get_model(ToneColorConverter, CONVERTER_CONFIG_URL, CONVERTER_CKPT_URL, device="cpu")
+    setattr(converter, 'enable_watermark', False)  # 💡 override after init without passing to __init__
+    return converter
 
-        style_se = torch.load(style_se_path, map_location="cpu")
-        
-        # Download + Load imran_se
-        imran_se_path = "checkpoints/base_speakers/EN/imran_khan_se.pth"
-        imran_se_url = "https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/imran_khan_se.pth"
-        download_if_missing(imran_se_url, imran_se_path)
-        imran_se = torch.load(imran_se_path, map_location="cpu")
-
-        #Download New Imran
-        #new_imran_se_path = "checkpoints/base_speakers/EN/new_imran.pth"
-        #new_imran_se_url = "https://huggingface.co/mariyumg/openvoice-checkpoints/resolve/main/base_speakers/EN/new_imran.pth"
-
-        #download_if_missing(new_imran_se_url, new_imran_se_path)
-        #new_imran_se = torch.load(new_imran_se_path, map_location="cpu")
-
-        
- 
 
+def load_se(registry, name):
+    se_path = f"{EN_DIR}/{name}.pth"
+    download_if_missing(f"{HF_BASE}/base_speakers/EN/{name}.pth", se_path)
+    return registry.get_tensor(se_path, device="cpu")
 
 
+@st.cache_resource
+def warm_up_converter(_registry):
+    # Once per server process, so no visitor pays the first-call costs.
+    return load_converter(_registry).warmup()
 
-    return tts_model, converter, default_se, style_se, imran_se
 
-# Load once and cache
-tts_model, converter, default_se, style_se, imran_se = load_models()
+registry = load_registry()
+with st.spinner("Warming up the voice converter..."):
+    warm_up_converter(registry)
 
 # Streamlit UI
 st.title("AnyOne, AnyWhere Voice Cloner")
@@ -115,16 +93,14 @@ if st.button("Convert") and uploaded_file:
         with open(temp_input_path, "wb") as f:
             f.write(uploaded_file.read())
 
-        temp_output_path = f"output_{uuid.uuid4().hex}.wav"
-
         # Pick source and target SE
-        source_se = default_se if style_option == "default" else style_se
-        target_se = (
-            default_se if style_option == "default" else
-            style_se if style_option == "style" else
-            imran_se
-        )
+        source_se = load_se(registry, "en_default_se" if style_option == "default" else "en_style_se")
+        target_se = load_se(registry, {
+            "default": "en_default_se",
+            "style": "en_style_se",
+        }.get(style_option, "imran_khan_se"))
 
+        converter = load_converter(registry)
         audio = converter.convert(
         temp_input_path,
         src_se=source_se,
@@ -134,11 +110,9 @@ if st.button("Convert") and uploaded_file:
 
 
 
-        sf.write(temp_output_path, audio, samplerate=24000)
-
-        st.audio(temp_output_path, format="audio/wav")
+        # Encoded in memory at the model's rate; no output file to write and clean up.
+        st.audio(encode_audio(audio, converter.hps.data.sampling_rate, "wav"), format="audio/wav")
 
         # Cleanup
         os.remove(temp_input_path)
-        os.remove(temp_output_path)
 
@@ -0,0 +1,84 @@
+"""
+How far bfloat16 mode moves the output from float32, measured with the
+released checkpoints, plus the speed-up.
+
+    python -m benchmarks.bf16_quality --reference resources/example_reference.mp3
+
+Sampling noise is off (noise_scale=0, noise_scale_w=0, tau=0), so the two
+dtypes run the same computation. For tts and convert it reports the SNR of
+the bf16 waveform against fp32 and the mean absolute difference of their
+log-mel spectrograms; for extract_se the cosine similarity of the two
+embeddings.
+"""
+import argparse
+
+import numpy as np
+import torch
+
+from benchmarks.common import DEFAULT_TEXT, add_model_args, load_model, timeit
+from openvoice.api import BaseSpeakerTTS, ToneColorConverter
+from openvoice.mel_processing import mel_spectrogram_torch
+
+
+def snr_db(reference, audio):
+    n = min(len(reference), len(audio))
+    noise = reference[:n] - audio[:n]
+    return 10 * np.log10(np.sum(reference[:n] ** 2) / max(np.sum(noise ** 2), 1e-20))
+
+
+def log_mel_distance(reference, audio, sampling_rate):
+    n = min(len(reference), len(audio))
+    mels = [mel_spectrogram_torch(torch.from_numpy(np.ascontiguousarray(a[:n]))[None], 1024, 80,
+                                  sampling_rate, 256, 1024, 0, None)
+            for a in (reference, audio)]
+    return (mels[0] - mels[1]).abs().mean().item()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    add_model_args(parser)
+    parser.add_argument('--reference', nargs='+', default=['resources/example_reference.mp3'],
+                        help='target voice for extract_se and convert')
+    parser.add_argument('--text', default=DEFAULT_TEXT)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--allow_random_weights', action='store_true',
+                        help='run without checkpoints (only checks that the script works)')
+    args = parser.parse_args()
+
+    results = {}
+    for dtype in ('float32', 'bfloat16'):
+        torch.manual_seed(0)
+        kwargs = dict(require_checkpoint=not args.allow_random_weights, device=args.device, dtype=dtype)
+        tts = load_model(BaseSpeakerTTS, args.ckpt_base, **kwargs)
+        converter = load_model(ToneColorConverter, args.ckpt_converter, enable_watermark=False, **kwargs)
+
+        def run_tts():
+            return tts.tts_batch([(args.text, 'default', 'English', 1.0)],
+                                 noise_scale=0., noise_scale_w=0., seed=0)[0]
+
+        # Both dtypes convert the fp32 tts output, so only the converter differs.
+        source = results['float32']['tts'] if results else run_tts()
+        src_se = converter.extract_se([source])
+        tgt_se = converter.extract_se(args.reference)
+
+        def run_convert():
+            return converter.convert_audio(source, src_se, tgt_se, tau=0., seed=0)
+
+        results[dtype] = {
+            'tts': run_tts(), 'convert': run_convert(), 'se': tgt_se.reshape(-1),
+            'tts_s': timeit(run_tts, args.repeat), 'convert_s': timeit(run_convert, args.repeat),
+        }
+
+    fp32, bf16 = results['float32'], results['bfloat16']
+    sr = tts.hps.data.sampling_rate
+    print(f"{'':<8} {'fp32 s':>7} {'bf16 s':>7} {'length':>15} {'SNR dB':>7} {'log-mel L1':>10}")
+    for name in ('tts', 'convert'):
+        a, b = fp32[name], bf16[name]
+        print(f"{name:<8} {fp32[name + '_s']:>7.3f} {bf16[name + '_s']:>7.3f} {f'{len(a)} / {len(b)}':>15} "
+              f"{snr_db(a, b):>7.1f} {log_mel_distance(a, b, sr):>10.4f}")
+    cosine = torch.nn.functional.cosine_similarity(fp32['se'], bf16['se'], dim=0).item()
+    print(f'extract_se cosine similarity: {cosine:.6f}')
+
+
+if __name__ == '__main__':
+    main()
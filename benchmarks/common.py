@@ -0,0 +1,46 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import time
+
+import torch
+
+DEFAULT_TEXT = ("Today is a nice day, and the weather is perfect for a walk in the park. "
+                "We stopped by the lake to watch the ducks before heading home for dinner.")
+
+
+def timeit(fn, repeat, warmup=1):
+    """Median wall time of fn() in seconds, after warmup untimed calls."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def add_model_args(parser):
+    parser.add_argument('--ckpt_base', default='checkpoints/base_speakers/EN',
+                        help='directory with the base speaker config.json and checkpoint.pth')
+    parser.add_argument('--ckpt_converter', default='checkpoints/converter',
+                        help='directory with the converter config.json and checkpoint.pth')
+    parser.add_argument('--device', default='cpu')
+
+
+def load_model(cls, ckpt_dir, require_checkpoint=False, **kwargs):
+    """cls(ckpt_dir/config.json) with ckpt_dir/checkpoint.pth loaded when it exists."""
+    model = cls(os.path.join(ckpt_dir, 'config.json'), **kwargs)
+    ckpt_path = os.path.join(ckpt_dir, 'checkpoint.pth')
+    if os.path.exists(ckpt_path):
+        model.load_ckpt(ckpt_path)
+    else:
+        assert not require_checkpoint, f'{ckpt_path} not found; download the checkpoints first'
+        print(f'{ckpt_path} not found, timing random weights')
+    return model
+
+
+def random_se(seed=0):
+    """A unit-norm [1, 256, 1] tone color embedding."""
+    se = torch.randn(1, 256, 1, generator=torch.Generator().manual_seed(seed))
+    return se / se.norm()
@@ -0,0 +1,63 @@
+"""
+Latency of a single tts and convert request as the cores given to it go from
+1 to N, with the work kept on one thread (num_workers=1, intra-op threads
+only) and spread over num_workers=cores threads (commons.parallel_map).
+
+    python -m benchmarks.parallel_decoding --max_cores 8
+
+The convert source is the tts output, so no audio files are needed.
+"""
+import argparse
+import os
+
+import numpy as np
+import torch
+
+from benchmarks.common import DEFAULT_TEXT, add_model_args, load_model, random_se, timeit
+from openvoice.api import BaseSpeakerTTS, ToneColorConverter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    add_model_args(parser)
+    parser.add_argument('--max_cores', type=int, default=os.cpu_count())
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--text', default=DEFAULT_TEXT)
+    args = parser.parse_args()
+
+    cores = sorted({1, args.max_cores} | {n for n in (2, 4, 8, 16, 32) if n < args.max_cores})
+    src_se, tgt_se = random_se(0), random_se(1)
+    source = None
+    reference = {}
+
+    print(f"{'cores':>5} {'num_workers':>11} {'tts s':>7} {'convert s':>9} {'convert diff':>12}")
+    for n in cores:
+        torch.set_num_threads(n)
+        for num_workers in sorted({1, n}):
+            # the same random weights every time when there is no checkpoint
+            torch.manual_seed(0)
+            tts = load_model(BaseSpeakerTTS, args.ckpt_base, device=args.device, num_workers=num_workers)
+            converter = load_model(ToneColorConverter, args.ckpt_converter, device=args.device,
+                                   num_workers=num_workers, enable_watermark=False)
+
+            def run_tts():
+                return tts.tts(args.text, None, speaker='default', seed=0)
+
+            if source is None:
+                source = run_tts()
+
+            def run_convert():
+                return converter.convert(source, src_se, tgt_se, seed=0)
+
+            tts_s = timeit(run_tts, args.repeat)
+            convert_s = timeit(run_convert, args.repeat)
+            # tts seeds each sentence batch, and the batching changes with
+            # num_workers, so only convert is expected to match exactly
+            audio = run_convert()
+            reference.setdefault('convert', audio)
+            diff = np.abs(audio - reference['convert']).max()
+            print(f'{n:>5} {num_workers:>11} {tts_s:>7.3f} {convert_s:>9.3f} {diff:>12.1e}')
+
+
+if __name__ == '__main__':
+    main()
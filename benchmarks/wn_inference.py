@@ -0,0 +1,52 @@
+"""
+Microbenchmark of WN.forward_inference against the training-path forward at
+typical voice conversion lengths.
+
+    python -m benchmarks.wn_inference --threads 4
+
+The WN shapes are the converter's: enc_q (16 layers, kernel 5) and one flow
+coupling layer (4 layers, kernel 5), hidden 192, gin 256. Lengths are in
+spectrogram frames (22050 Hz, hop 256: about 86 frames per second).
+"""
+import argparse
+
+import torch
+
+from benchmarks.common import timeit
+from openvoice import modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[172, 430, 861, 2584])
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+
+    print(f'threads={torch.get_num_threads()}')
+    print(f"{'module':<8} {'T':>5} {'g':>4} {'forward ms':>11} {'inference ms':>13} {'max diff':>9}")
+    for name, n_layers in (('enc_q', 16), ('flow', 4)):
+        wn = modules.WN(192, 5, 1, n_layers, gin_channels=256)
+        for T in args.lengths:
+            x = torch.randn(1, 192, T)
+            x_mask = torch.ones(1, 1, T)
+            x_mask[..., T - T // 10:] = 0
+            for g in (None, torch.randn(1, 256, 1)):
+                with torch.no_grad():
+                    # train() with p_dropout=0 selects the original path, eval() the in-place one
+                    wn.train()
+                    ref = wn(x, x_mask, g=g)
+                    ref_ms = 1000 * timeit(lambda: wn(x, x_mask, g=g), args.repeat)
+                    wn.eval()
+                    out = wn(x, x_mask, g=g)
+                    inf_ms = 1000 * timeit(lambda: wn(x, x_mask, g=g), args.repeat)
+                diff = (out - ref).abs().max().item()
+                print(f"{name:<8} {T:>5} {'yes' if g is not None else 'no':>4} "
+                      f"{ref_ms:>11.1f} {inf_ms:>13.1f} {diff:>9.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-worker memory and throughput of a WorkerPool serving tts and convert.
+
+    python -m benchmarks.worker_pool --num_workers 1 2 4 --requests 16
+
+The models are loaded once in this process and shared with the workers
+(see workers.WorkerPool). For each pool size it reports requests per second
+and each worker's rss, pss and private memory after serving: rss counts the
+shared weight pages in every worker, pss splits them between the processes
+mapping them, and private is what a worker really adds. Separate processes
+that each load the models would add about the parent's rss per worker.
+"""
+import argparse
+import time
+
+import torch
+
+from benchmarks.common import DEFAULT_TEXT, add_model_args, load_model, random_se
+from openvoice.api import BaseSpeakerTTS, ToneColorConverter
+from openvoice.workers import WorkerPool, memory_usage
+
+
+def mb(n):
+    return n / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    add_model_args(parser)
+    parser.add_argument('--num_workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--num_threads', type=int, default=None, help='intra-op threads per worker')
+    parser.add_argument('--requests', type=int, default=16, help='requests per pool size, half tts, half convert')
+    parser.add_argument('--text', default=DEFAULT_TEXT)
+    args = parser.parse_args()
+
+    models = {
+        'tts': load_model(BaseSpeakerTTS, args.ckpt_base, device=args.device),
+        'converter': load_model(ToneColorConverter, args.ckpt_converter, device=args.device, enable_watermark=False),
+    }
+    with torch.no_grad():
+        source = models['tts'].tts(args.text, None, speaker='default', seed=0)
+    src_se, tgt_se = random_se(0), random_se(1)
+    parent = memory_usage()
+    print(f"parent: rss {mb(parent['rss']):.0f} MB, pss {mb(parent['pss']):.0f} MB")
+
+    requests = [('tts', 'tts', (args.text, None, 'default'), {'seed': k}) if k % 2 == 0 else
+                ('converter', 'convert', (source, src_se, tgt_se), {'seed': k})
+                for k in range(args.requests)]
+    for num_workers in args.num_workers:
+        with WorkerPool(models, num_workers=num_workers, num_threads=args.num_threads) as pool:
+            # first calls pay one-off costs in every worker
+            warm = [pool.submit(*request[:2], *request[2], **request[3]) for request in requests[:2 * num_workers]]
+            [future.result() for future in warm]
+            start = time.perf_counter()
+            futures = [pool.submit(name, method, *a, **kw) for name, method, a, kw in requests]
+            [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+            usage = pool.memory_usage()
+
+        print(f'num_workers={num_workers} (threads {pool.num_threads} each): '
+              f'{len(requests) / elapsed:.2f} requests/s over {elapsed:.1f} s')
+        for pid, u in usage.items():
+            print(f"  worker {pid}: rss {mb(u['rss']):.0f} MB, pss {mb(u['pss']):.0f} MB, "
+                  f"private {mb(u['private']):.0f} MB")
+        total = memory_usage()['pss'] + sum(u['pss'] for u in usage.values())
+        print(f"  pss of parent + workers {mb(total):.0f} MB; "
+              f"{num_workers} separately loaded processes ~{mb(num_workers * parent['rss']):.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
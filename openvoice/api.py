@@ -1,32 +1,49 @@
 import torch
 import numpy as np
 import re
-import soundfile
 from openvoice import utils
 from openvoice import commons
 import os
-import librosa
+import glob
 import json
-import requests
-import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from openvoice.text import text_to_sequence
-from openvoice.mel_processing import spectrogram_torch
+from openvoice.text.token_cache import token_key, get_token_cache
+from openvoice.mel_processing import spectrogram_torch, spectrogram_torch_batch, ConvSTFT
 from openvoice.models import SynthesizerTrn
+from openvoice.scheduler import LengthBucketScheduler
+from openvoice.audio import as_decoded_audio, save_audio, audio_hash
+from openvoice.response_cache import response_key, tensor_hash, state_dict_hash
+from openvoice.assets import get_asset_manager
+from openvoice.vad import speech_flags, frames_to_segments
 
 
 class OpenVoiceBaseClass(object):
-    def __init__(self, config_path, device='cuda:0'):
+    dtypes = ('float32', 'bfloat16')
+    # Input lengths warmup() runs by default: text tokens for BaseSpeakerTTS,
+    # spectrogram frames for ToneColorConverter.
+    warmup_lengths = (32, 128)
+
+    def __init__(self, config_path, device='cuda:0', dec_chunk_size=None, num_workers=1, dtype='float32',
+                 response_cache=None):
+        """
+        dec_chunk_size: decode latents longer than this many frames in chunks
+            (Generator.forward_chunked), bounding the decoder's peak memory
+        num_workers: threads a single request is spread over, each with an
+            equal share of torch's intra-op threads (decoder chunks, tts sentences)
+        dtype: 'bfloat16' runs the model under autocast (see autocast)
+        response_cache: a ResponseCache for the results of seeded requests
+        """
         if 'cuda' in device:
             assert torch.cuda.is_available()
+        assert dtype in self.dtypes, f"dtype {dtype} is not supported"
+        self.dtype = dtype
 
-        # 🔽 Load config from URL or local path
-        if config_path.startswith("http"):
-            response = requests.get(config_path)
-            response.raise_for_status()
-            config = json.loads(response.text)
-        else:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
+        # 🔽 Load config from URL (through the asset cache) or local path
+        config_path = get_asset_manager().resolve(config_path)
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
 
         hps = utils.dict_to_namespace(config)
 
@@ -38,21 +55,71 @@ class OpenVoiceBaseClass(object):
         ).to(device)
 
         model.eval()
+        model.dec.chunk_size = dec_chunk_size
+        model.dec.num_workers = num_workers
+        self.num_workers = num_workers
         self.model = model
         self.hps = hps
+        self.config = config
         self.device = device
+        self.response_cache = response_cache
+        self._fingerprint = None
+
+    def autocast(self):
+        """
+        Context for model calls. In bfloat16 mode convs, matmuls and the GRU
+        run in bf16 while weights stay fp32; spectrograms, durations and the
+        spline flows are kept in fp32 inside the model. A no-op in float32 mode.
+        """
+        return torch.autocast(torch.device(self.device).type, dtype=torch.bfloat16,
+                              enabled=self.dtype == 'bfloat16')
+
+    def fingerprint(self):
+        """Identifies the config, weights and dtype, so cached responses never outlive a model change."""
+        if self._fingerprint is None:
+            self._fingerprint = response_key(cls=type(self).__name__, config=self.config,
+                                             weights=state_dict_hash(self.model), dtype=self.dtype)
+        return self._fingerprint
+
+    def cached_response(self, seed, compute, fields):
+        """
+        compute() for a request. When a response_cache is set and the request
+        is seeded (so deterministic), it is served from and stored in the
+        cache under the fields that determine it (a callable returning a
+        dict, only evaluated when caching) plus seed and fingerprint().
+        """
+        if seed is None or self.response_cache is None:
+            return compute()
+        key = response_key(model=self.fingerprint(), seed=int(seed), **fields())
+        return self.response_cache.get_or_compute(key, compute)
+
+    def warmup(self, lengths=None):
+        """
+        Run inputs of each length in lengths (default warmup_lengths) through
+        the model, so that kernel and primitive creation, allocator growth,
+        the window caches and lazy imports happen now rather than on the
+        first request. Returns the seconds it took.
+        """
+        start = time.perf_counter()
+        with torch.no_grad(), self.autocast():
+            for length in lengths or self.warmup_lengths:
+                self.warmup_length(length)
+        elapsed = time.perf_counter() - start
+        print(f"Warmed up {type(self).__name__} ({self.dtype}) in {elapsed:.2f}s")
+        return elapsed
+
+    def warmup_length(self, length):
+        """Run one input of length through the model; the subclasses say what that is, here it is nothing."""
+        pass
 
     def load_ckpt(self, ckpt_path):
+        assert not getattr(self, 'frozen', False), 'cannot load a checkpoint into a frozen model (see workers.freeze_model)'
         # Download from URL if necessary
-        if ckpt_path.startswith("http"):
-            response = requests.get(ckpt_path)
-            response.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                tmp.write(response.content)
-                ckpt_path = tmp.name
+        ckpt_path = get_asset_manager().resolve(ckpt_path)
 
         checkpoint_dict = torch.load(ckpt_path, map_location=torch.device(self.device))
         a, b = self.model.load_state_dict(checkpoint_dict['model'], strict=False)
+        self._fingerprint = None
         print("Loaded checkpoint '{}'".format(ckpt_path))
         print('missing/unexpected keys:', a, b)
 
@@ -63,12 +130,23 @@ class BaseSpeakerTTS(OpenVoiceBaseClass):
         "chinese": "ZH",
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = LengthBucketScheduler(num_workers=self.num_workers)
+
     @staticmethod
     def get_text(text, hps, is_symbol):
-        text_norm = text_to_sequence(text, hps.symbols, [] if is_symbol else hps.data.text_cleaners)
-        if hps.data.add_blank:
-            text_norm = commons.intersperse(text_norm, 0)
-        text_norm = torch.LongTensor(text_norm)
+        cleaner_names = [] if is_symbol else hps.data.text_cleaners
+
+        def compute():
+            text_norm = text_to_sequence(text, hps.symbols, cleaner_names)
+            if hps.data.add_blank:
+                text_norm = commons.intersperse(text_norm, 0)
+            return text_norm
+
+        # Repeated sentences skip the cleaners (see openvoice.text.token_cache).
+        key = token_key(text, hps.symbols, cleaner_names, hps.data.add_blank)
+        text_norm = torch.LongTensor(get_token_cache().get_or_compute(key, compute))
         return text_norm
 
     @staticmethod
@@ -88,36 +166,102 @@ class BaseSpeakerTTS(OpenVoiceBaseClass):
         print(" > ===========================")
         return texts
 
-    def tts(self, text, output_path, speaker, language='English', speed=1.0):
-        mark = self.language_marks.get(language.lower(), None)
-        assert mark is not None, f"language {language} is not supported"
-
-        texts = self.split_sentences_into_pieces(text, mark)
-
-        audio_list = []
-        for t in texts:
-            t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
-            t = f'[{mark}]{t}[{mark}]'
-            stn_tst = self.get_text(t, self.hps, False)
-            device = self.device
-            speaker_id = self.hps.speakers[speaker]
-            with torch.no_grad():
-                x_tst = stn_tst.unsqueeze(0).to(device)
-                x_tst_lengths = torch.LongTensor([stn_tst.size(0)]).to(device)
-                sid = torch.LongTensor([speaker_id]).to(device)
-                audio = self.model.infer(x_tst, x_tst_lengths, sid=sid, noise_scale=0.667, noise_scale_w=0.6,
-                                    length_scale=1.0 / speed)[0][0, 0].data.cpu().float().numpy()
-            audio_list.append(audio)
-        audio = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
+    def warmup(self, lengths=None, languages=('English',)):
+        """OpenVoiceBaseClass.warmup, after loading the text front end of each language."""
+        for language in languages:
+            mark = self.language_marks[language.lower()]
+            self.sentence_to_sequence('Warm up.' if mark == 'EN' else '预热。', mark)
+        return super().warmup(lengths)
+
+    def warmup_length(self, length):
+        # Random tokens through infer, alone and in a padded batch of two, as the scheduler runs them.
+        x = torch.randint(1, len(self.hps.symbols), (2, length), device=self.device)
+        x_lengths = torch.LongTensor([length, max(1, length // 2)]).to(self.device)
+        sid = torch.zeros(2, dtype=torch.long, device=self.device)
+        self.model.infer(x[:1], x_lengths[:1], sid=sid[:1], noise_scale=0.667, noise_scale_w=0.6)
+        self.model.infer(x, x_lengths, sid=sid, noise_scale=0.667, noise_scale_w=0.6)
+
+    def sentence_to_sequence(self, sentence, mark):
+        sentence = re.sub(r'([a-z])([A-Z])', r'\1 \2', sentence)
+        return self.get_text(f'[{mark}]{sentence}[{mark}]', self.hps, False)
+
+    def tts(self, text, output_path, speaker, language='English', speed=1.0, seed=None):
+        """seed: makes the result reproducible, and cacheable with a response_cache"""
+        scheduler = self.scheduler
+        # Keyed on the exact text: even NFKC or whitespace changes can change the sentences and tokens.
+        audio = self.cached_response(
+            seed, lambda: self.tts_batch([(text, speaker, language, speed)], seed=seed)[0],
+            lambda: dict(task='tts', text=text, speaker=speaker, language=language.lower(), speed=float(speed),
+                         batching=[scheduler.max_tokens, scheduler.max_batch_size,
+                                   scheduler.max_padding_ratio, scheduler.num_workers]))
 
         if output_path is None:
             return audio
         else:
-            soundfile.write(output_path, audio, self.hps.data.sampling_rate)
+            save_audio(output_path, audio, self.hps.data.sampling_rate)
+
+    def tts_batch(self, items, noise_scale=0.667, noise_scale_w=0.6, seed=None):
+        """
+        items: (text, speaker, language, speed) tuples
+        seed: see LengthBucketScheduler.infer
+        returns one waveform per item
+
+        The sentences of all items share the scheduler's batches; speaker and
+        speed are passed to infer per row.
+        """
+        device = self.device
+        sequences, speaker_ids, speeds, owners = [], [], [], []
+        for k, (text, speaker, language, speed) in enumerate(items):
+            mark = self.language_marks.get(language.lower(), None)
+            assert mark is not None, f"language {language} is not supported"
+            speaker_id = vars(self.hps.speakers)[speaker]
+
+            for t in self.split_sentences_into_pieces(text, mark):
+                sequences.append(self.sentence_to_sequence(t, mark))
+                speaker_ids.append(speaker_id)
+                speeds.append(speed)
+                owners.append(k)
+
+        with torch.no_grad(), self.autocast():
+            sid = torch.LongTensor(speaker_ids).to(device)
+            length_scale = 1.0 / torch.tensor(speeds, dtype=torch.float32)
+            audio_list = self.scheduler.infer(self.model, sequences, device, sid=sid, noise_scale=noise_scale,
+                                              noise_scale_w=noise_scale_w, length_scale=length_scale, seed=seed)
+
+        pieces = [[] for _ in items]
+        for audio, owner in zip(audio_list, owners):
+            pieces[owner].append(audio)
+        return [self.audio_numpy_concat(p, sr=self.hps.data.sampling_rate, speed=item[3])
+                for p, item in zip(pieces, items)]
+
+    def tts_stream(self, fragments, speaker, language='English', speed=1.0, noise_scale=0.667, noise_scale_w=0.6,
+                   seed=None):
+        """
+        Speech for text that arrives in fragments, e.g. tokens from a language
+        model. Yields one waveform per sentence (with the pause tts puts
+        after it) as soon as utils.IncrementalSentenceSplitter has confirmed
+        the sentence, so playback starts while the text is still being
+        written. The sentences are those tts would make of the whole text;
+        sentence k is seeded with seed + k.
+        """
+        mark = self.language_marks.get(language.lower(), None)
+        assert mark is not None, f"language {language} is not supported"
+        sid = torch.LongTensor([vars(self.hps.speakers)[speaker]]).to(self.device)
+        splitter = utils.IncrementalSentenceSplitter(language_str=mark)
+        for k, sentence in enumerate(splitter.split(fragments)):
+            with torch.no_grad(), self.autocast():
+                audio = self.scheduler.infer(self.model, [self.sentence_to_sequence(sentence, mark)], self.device,
+                                             seed=None if seed is None else seed + k, sid=sid,
+                                             noise_scale=noise_scale, noise_scale_w=noise_scale_w,
+                                             length_scale=1.0 / speed)[0]
+            yield self.audio_numpy_concat([audio], sr=self.hps.data.sampling_rate, speed=speed)
 
 
 class ToneColorConverter(OpenVoiceBaseClass):
-    def __init__(self, *args, enable_watermark=True, **kwargs):
+    spec_backends = ('stft', 'conv')
+    warmup_lengths = (64, 256)
+
+    def __init__(self, *args, enable_watermark=True, spec_backend='stft', **kwargs):
         super().__init__(*args, **kwargs)
 
         # ✅ Check both kwarg and explicit arg
@@ -135,26 +279,61 @@ class ToneColorConverter(OpenVoiceBaseClass):
 
         self.version = getattr(self.hps, '_version_', "v1")
 
+        assert spec_backend in self.spec_backends, f"spectrogram backend {spec_backend} is not supported"
+        self.spec_backend = spec_backend
+        if spec_backend == 'conv':
+            hps = self.hps
+            self.conv_stft = ConvSTFT(hps.data.filter_length, hps.data.hop_length, hps.data.win_length).to(self.device)
+        else:
+            self.conv_stft = None
+
+    def warmup_length(self, length):
+        # Noise of length frames through the spectrogram, ref_enc (extract_se)
+        # and voice_conversion, with the embedding ref_enc gives as both voices.
+        hop = self.hps.data.hop_length
+        n_fft = self.hps.data.filter_length
+        y = 0.1 * torch.randn(1, length * hop + n_fft - hop, device=self.device)
+        spec = self.spectrogram(y)
+        spec_lengths = torch.LongTensor([spec.size(-1)]).to(self.device)
+        se = self.model.ref_enc(spec.transpose(1, 2)).unsqueeze(-1).float()
+        self.model.voice_conversion(spec, spec_lengths, sid_src=se, sid_tgt=se, tau=0.3)
+
+    def spectrogram(self, y):
+        hps = self.hps
+        if self.conv_stft is not None:
+            return self.conv_stft(y)
+        return spectrogram_torch(y, hps.data.filter_length,
+                                 hps.data.sampling_rate, hps.data.hop_length, hps.data.win_length,
+                                 center=False)
+
+    def spectrogram_batch(self, y, y_lengths=None):
+        hps = self.hps
+        return spectrogram_torch_batch(y, y_lengths, hps.data.filter_length,
+                                       hps.data.sampling_rate, hps.data.hop_length, hps.data.win_length,
+                                       center=False, stft=self.conv_stft)
+
+    def load_wav(self, audio):
+        """Mono float32 waveform at the model rate from a path, a DecodedAudio,
+        or an array that is already at that rate."""
+        if isinstance(audio, np.ndarray):
+            return audio
+        return as_decoded_audio(audio).resample(self.hps.data.sampling_rate)
+
     def extract_se(self, ref_wav_list, se_save_path=None):
-        if isinstance(ref_wav_list, str):
+        if not isinstance(ref_wav_list, (list, tuple)):
             ref_wav_list = [ref_wav_list]
 
         device = self.device
         hps = self.hps
-        gs = []
 
-        for fname in ref_wav_list:
-            audio_ref, sr = librosa.load(fname, sr=hps.data.sampling_rate)
-            y = torch.FloatTensor(audio_ref)
-            y = y.to(device)
-            y = y.unsqueeze(0)
-            y = spectrogram_torch(y, hps.data.filter_length,
-                                        hps.data.sampling_rate, hps.data.hop_length, hps.data.win_length,
-                                        center=False).to(device)
-            with torch.no_grad():
-                g = self.model.ref_enc(y.transpose(1, 2)).unsqueeze(-1)
-                gs.append(g.detach())
-        gs = torch.stack(gs).mean(0)
+        waves = []
+        for ref_wav in ref_wav_list:
+            waves.append(torch.from_numpy(self.load_wav(ref_wav)).to(device))
+
+        with torch.no_grad(), self.autocast():
+            spec, spec_lengths, spec_mask = self.spectrogram_batch(waves)
+            g = self.model.ref_enc(spec.transpose(1, 2), mask=spec_mask).unsqueeze(-1)
+            gs = g.detach().float().mean(0, keepdim=True)
 
         if se_save_path is not None:
             os.makedirs(os.path.dirname(se_save_path), exist_ok=True)
@@ -162,25 +341,220 @@ class ToneColorConverter(OpenVoiceBaseClass):
 
         return gs
 
-    def convert(self, audio_src_path, src_se, tgt_se, output_path=None, tau=0.3, message="default"):
+    def convert(self, audio_src_path, src_se, tgt_se, output_path=None, tau=0.3, message="default",
+                skip_silence=False, silence_noise=0., seed=None):
+        """
+        skip_silence: run the model on voiced spans only (see convert_voiced);
+            silent stretches come out as zeros, or as Gaussian noise with
+            standard deviation silence_noise.
+        seed: makes the result reproducible, and cacheable with a response_cache
+        """
         hps = self.hps
-        audio, sample_rate = librosa.load(audio_src_path, sr=hps.data.sampling_rate)
-        audio = torch.tensor(audio).float()
+        if seed is not None and self.response_cache is not None and not isinstance(audio_src_path, np.ndarray):
+            # Decoded once for both the cache key and the conversion.
+            audio_src_path = as_decoded_audio(audio_src_path)
+
+        def fields():
+            source = audio_src_path
+            return dict(task='convert',
+                        source=audio_hash(source) if isinstance(source, np.ndarray) else source.content_hash,
+                        src_se=tensor_hash(src_se), tgt_se=tensor_hash(tgt_se), tau=float(tau), message=message,
+                        watermark=self.watermark_model is not None, skip_silence=bool(skip_silence),
+                        silence_noise=float(silence_noise), spec_backend=self.spec_backend)
+
+        audio = self.cached_response(
+            seed, lambda: self.convert_audio(audio_src_path, src_se, tgt_se, tau=tau, message=message,
+                                             skip_silence=skip_silence, silence_noise=silence_noise, seed=seed),
+            fields)
+        if output_path is None:
+            return audio
+        else:
+            save_audio(output_path, audio, hps.data.sampling_rate)
 
-        with torch.no_grad():
-            y = torch.FloatTensor(audio).to(self.device)
+    def convert_audio(self, audio_src_path, src_se, tgt_se, tau=0.3, message="default",
+                      skip_silence=False, silence_noise=0., seed=None):
+        """The waveform convert() returns, computed without the response cache."""
+        audio = self.load_wav(audio_src_path)
+        generator = commons.make_generator(seed)
+
+        with torch.no_grad(), self.autocast():
+            y = torch.from_numpy(audio).to(self.device)
             y = y.unsqueeze(0)
-            spec = spectrogram_torch(y, hps.data.filter_length,
-                                    hps.data.sampling_rate, hps.data.hop_length, hps.data.win_length,
-                                    center=False).to(self.device)
-            spec_lengths = torch.LongTensor([spec.size(-1)]).to(self.device)
-            audio = self.model.voice_conversion(spec, spec_lengths, sid_src=src_se, sid_tgt=tgt_se, tau=tau)[0][
-                        0, 0].data.cpu().float().numpy()
-            audio = self.add_watermark(audio, message)
-            if output_path is None:
-                return audio
+            spec = self.spectrogram(y)
+            if skip_silence:
+                audio = self.convert_voiced(spec, src_se, tgt_se, tau=tau, silence_noise=silence_noise,
+                                            generator=generator)
+            else:
+                spec_lengths = torch.LongTensor([spec.size(-1)]).to(self.device)
+                audio = self.model.voice_conversion(spec, spec_lengths, sid_src=src_se, sid_tgt=tgt_se, tau=tau,
+                                                    generator=generator)[0][0, 0].data.cpu().float().numpy()
+            return self.add_watermark(audio, message)
+
+    # Skip-silence settings, in seconds. Pauses shorter than silence_min_duration
+    # are converted along with the speech around them; every voiced span gets
+    # silence_context of source on both sides and a silence_fade cross-fade
+    # into the surrounding silence.
+    silence_min_duration = 0.5
+    silence_context = 0.1
+    silence_fade = 0.02
+
+    def voiced_spans(self, spec):
+        """[(start_frame, end_frame), ...] of a [1, n_fft // 2 + 1, t] spectrogram, context included."""
+        hps = self.hps
+        n_fft, win_size = hps.data.filter_length, hps.data.win_length
+        # Parseval: one-sided bin power -> mean power of the (hann windowed) frame.
+        power = spec[0].float().square().sum(0) * 2 / (n_fft * 0.375 * win_size)
+        energy_db = (10. * torch.log10(power + 1e-10)).cpu().numpy()
+        n_frames = len(energy_db)
+        return frames_to_segments(
+            speech_flags(energy_db), 1, 1, n_frames,
+            min_speech_duration=0.1,
+            min_silence_duration=self.silence_min_duration,
+            speech_pad=min(self.silence_context, self.silence_min_duration / 2),
+            sample_rate=hps.data.sampling_rate / hps.data.hop_length,
+        )
+
+    def convert_voiced(self, spec, src_se, tgt_se, tau=0.3, silence_noise=0., batch_size=8, generator=None):
+        """
+        Convert only the voiced spans of spec, batched, and stitch them into a
+        waveform of the length voice_conversion would return.
+        """
+        hps = self.hps
+        device = self.device
+        hop = hps.data.hop_length
+        n_frames = spec.size(-1)
+        spans = self.voiced_spans(spec)
+        if spans == [(0, n_frames)]:
+            spec_lengths = torch.LongTensor([n_frames]).to(device)
+            return self.model.voice_conversion(spec, spec_lengths, sid_src=src_se, sid_tgt=tgt_se, tau=tau,
+                                               generator=generator)[0][0, 0].data.cpu().float().numpy()
+
+        if silence_noise > 0:
+            if generator is None:
+                noise = np.random.randn(n_frames * hop)
             else:
-                soundfile.write(output_path, audio, hps.data.sampling_rate)
+                noise = torch.randn(n_frames * hop, generator=generator).numpy()
+            audio = (silence_noise * noise).astype(np.float32)
+        else:
+            audio = np.zeros(n_frames * hop, dtype=np.float32)
+
+        fade = min(int(self.silence_fade * hps.data.sampling_rate), int(self.silence_context * hps.data.sampling_rate))
+        ramp = np.linspace(0., 1., fade, dtype=np.float32)
+        order = sorted(range(len(spans)), key=lambda i: spans[i][1] - spans[i][0])
+        for start in range(0, len(order), batch_size):
+            index = order[start:start + batch_size]
+            lengths = [spans[i][1] - spans[i][0] for i in index]
+            batch = spec.new_zeros(len(index), spec.size(1), max(lengths))
+            for j, i in enumerate(index):
+                batch[j, :, :lengths[j]] = spec[0, :, spans[i][0]:spans[i][1]]
+            spec_lengths = torch.LongTensor(lengths).to(device)
+            n = len(index)
+            o_hat = self.model.voice_conversion(batch, spec_lengths,
+                                                sid_src=src_se.reshape(1, -1, 1).expand(n, -1, -1),
+                                                sid_tgt=tgt_se.reshape(1, -1, 1).expand(n, -1, -1), tau=tau,
+                                                generator=generator)[0]
+            o_hat = o_hat[:, 0].data.cpu().float().numpy()
+            for j, i in enumerate(index):
+                a, b = spans[i][0] * hop, spans[i][1] * hop
+                segment = o_hat[j, :b - a]
+                # Span edges lie inside the context, where the source is silent.
+                if a > 0 and fade > 0:
+                    segment[:fade] = segment[:fade] * ramp + audio[a:a + fade] * (1. - ramp)
+                if b < len(audio) and fade > 0:
+                    segment[-fade:] = segment[-fade:] * ramp[::-1] + audio[b - fade:b] * ramp
+                audio[a:b] = segment
+        return audio
+
+    @staticmethod
+    def per_item_se(se, n):
+        if isinstance(se, (list, tuple)):
+            assert len(se) == n, f"expected {n} embeddings, got {len(se)}"
+            return [s.reshape(1, -1, 1) for s in se]
+        return [se.reshape(1, -1, 1)] * n
+
+    def convert_batch(self, audio_src_list, src_se, tgt_se, output_paths=None, tau=0.3, message="default", batch_size=8,
+                      seed=None):
+        """
+        Convert many sources with batched voice_conversion calls.
+
+        audio_src_list: paths, DecodedAudio objects or model-rate arrays
+        src_se / tgt_se: one embedding shared by all items, or a list with one per item
+        Items are sorted by length and cut into batches of batch_size, so padding
+        stays small. Returns the converted waveforms in input order, each trimmed
+        to its own length, or writes them to output_paths.
+        """
+        hps = self.hps
+        device = self.device
+        generator = commons.make_generator(seed)
+        n = len(audio_src_list)
+        src_ses = self.per_item_se(src_se, n)
+        tgt_ses = self.per_item_se(tgt_se, n)
+
+        waves = [torch.from_numpy(self.load_wav(audio)) for audio in audio_src_list]
+        order = sorted(range(n), key=lambda i: waves[i].size(0))
+        audios = [None] * n
+        with torch.no_grad(), self.autocast():
+            for start in range(0, n, batch_size):
+                index = order[start:start + batch_size]
+                spec, spec_lengths, spec_mask = self.spectrogram_batch([waves[i].to(device) for i in index])
+                g_src = torch.cat([src_ses[i] for i in index]).to(device)
+                g_tgt = torch.cat([tgt_ses[i] for i in index]).to(device)
+                o_hat = self.model.voice_conversion(spec, spec_lengths, sid_src=g_src, sid_tgt=g_tgt, tau=tau,
+                                                    generator=generator)[0]
+                audio_lengths = (spec_lengths * hps.data.hop_length).tolist()
+                for j, i in enumerate(index):
+                    audios[i] = o_hat[j, 0, :audio_lengths[j]].data.cpu().float().numpy()
+
+        audios = [self.add_watermark(audio, message) for audio in audios]
+        if output_paths is None:
+            return audios
+        for audio, output_path in zip(audios, output_paths):
+            save_audio(output_path, audio, hps.data.sampling_rate)
+
+    def convert_fanout(self, audio_src_path, src_se, tgt_ses, output_paths=None, tau=0.3, message="default", batch_size=8,
+                       seed=None):
+        """
+        Convert one source into many target voices.
+
+        The spectrogram, posterior encoder and forward flow depend only on the
+        source, so they run once; only the reverse flow and the decoder run per
+        target, batch_size targets at a time. Returns one waveform per entry of
+        tgt_ses, or writes them to output_paths.
+        """
+        hps = self.hps
+        device = self.device
+        audio = self.load_wav(audio_src_path)
+
+        audios = []
+        with torch.no_grad(), self.autocast():
+            y = torch.from_numpy(audio).to(device)
+            y = y.unsqueeze(0)
+            spec = self.spectrogram(y)
+            spec_lengths = torch.LongTensor([spec.size(-1)]).to(device)
+            z, z_p, y_mask = self.model.encode_source(spec, spec_lengths, sid_src=src_se, tau=tau,
+                                                      generator=commons.make_generator(seed))
+            for start in range(0, len(tgt_ses), batch_size):
+                g_tgt = torch.cat([se.reshape(1, -1, 1) for se in tgt_ses[start:start + batch_size]]).to(device)
+                n = g_tgt.size(0)
+                o_hat, _ = self.model.decode_target(z_p.expand(n, -1, -1), y_mask.expand(n, -1, -1), sid_tgt=g_tgt)
+                audios += [o.data.cpu().float().numpy() for o in o_hat[:, 0]]
+
+        audios = [self.add_watermark(audio, message) for audio in audios]
+        if output_paths is None:
+            return audios
+        for audio, output_path in zip(audios, output_paths):
+            save_audio(output_path, audio, hps.data.sampling_rate)
+
+    # Watermark layout: one 32-bit slice of the message per K-sample chunk,
+    # chunk n starting at sample coeff * n * K.
+    watermark_chunk = 16000
+    watermark_stride = 2
+
+    def watermark_chunk_index(self, n_samples, n_repeat):
+        K = self.watermark_chunk
+        coeff = self.watermark_stride
+        n_fit = min(n_repeat, (n_samples // K + 1) // coeff)
+        return (coeff * K * np.arange(n_fit))[:, None] + np.arange(K)
 
     def add_watermark(self, audio, message):
         if self.watermark_model is None:
@@ -189,36 +563,43 @@ class ToneColorConverter(OpenVoiceBaseClass):
         bits = utils.string_to_bits(message).reshape(-1)
         n_repeat = len(bits) // 32
 
-        K = 16000
-        coeff = 2
-        for n in range(n_repeat):
-            trunck = audio[(coeff * n) * K: (coeff * n + 1) * K]
-            if len(trunck) != K:
-                print('Audio too short, fail to add watermark')
-                break
-            message_npy = bits[n * 32: (n + 1) * 32]
-
-            with torch.no_grad():
-                signal = torch.FloatTensor(trunck).to(device)[None]
-                message_tensor = torch.FloatTensor(message_npy).to(device)[None]
-                signal_wmd_tensor = self.watermark_model.encode(signal, message_tensor)
-                signal_wmd_npy = signal_wmd_tensor.detach().cpu().squeeze()
-            audio[(coeff * n) * K: (coeff * n + 1) * K] = signal_wmd_npy
+        index = self.watermark_chunk_index(len(audio), n_repeat)
+        if len(index) < n_repeat:
+            print('Audio too short, fail to add watermark')
+        if len(index) == 0:
+            return audio
+
+        with torch.no_grad():
+            signal = torch.from_numpy(np.ascontiguousarray(audio[index], dtype=np.float32)).to(device)
+            message_tensor = torch.from_numpy(bits[: len(index) * 32].reshape(-1, 32)).float().to(device)
+            signal_wmd_tensor = self.watermark_model.encode(signal, message_tensor)
+            audio[index] = signal_wmd_tensor.detach().cpu().numpy()
         return audio
 
     def detect_watermark(self, audio, n_repeat):
-        bits = []
-        K = 16000
-        coeff = 2
-        for n in range(n_repeat):
-            trunck = audio[(coeff * n) * K: (coeff * n + 1) * K]
-            if len(trunck) != K:
-                print('Audio too short, fail to detect watermark')
-                return 'Fail'
-            with torch.no_grad():
-                signal = torch.FloatTensor(trunck).to(self.device).unsqueeze(0)
-                message_decoded_npy = (self.watermark_model.decode(signal) >= 0.5).int().detach().cpu().numpy().squeeze()
-            bits.append(message_decoded_npy)
-        bits = np.stack(bits).reshape(-1, 8)
-        message = utils.bits_to_string(bits)
+        index = self.watermark_chunk_index(len(audio), n_repeat)
+        if len(index) < n_repeat:
+            print('Audio too short, fail to detect watermark')
+            return 'Fail'
+        with torch.no_grad():
+            signal = torch.from_numpy(np.ascontiguousarray(audio[index], dtype=np.float32)).to(self.device)
+            bits = (self.watermark_model.decode(signal) >= 0.5).detach().cpu().numpy()
+        message = utils.bits_to_string(bits.reshape(-1, 8))
         return message
+
+    def detect_watermark_many(self, audio_paths, n_repeat, max_workers=None):
+        """
+        Detect watermarks in many files, e.g. to audit a directory of generated
+        audio. audio_paths is a directory (all .wav files in it) or a list of
+        paths. Decoding runs in a thread pool; each file is one batched decode
+        call. Returns {path: message}.
+        """
+        if isinstance(audio_paths, str):
+            audio_paths = sorted(glob.glob(os.path.join(audio_paths, '*.wav')))
+
+        def detect(path):
+            return self.detect_watermark(self.load_wav(path), n_repeat)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            messages = list(executor.map(detect, audio_paths))
+        return dict(zip(audio_paths, messages))
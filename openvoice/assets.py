@@ -0,0 +1,273 @@
+import os
+import time
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def content_range(response):
+    """(start, total) from a response's Content-Range header, e.g. 'bytes 100-199/1000'
+    or 'bytes */1000'; either is None when the header does not give it."""
+    value = response.headers.get('Content-Range', '')
+    unit, _, spec = value.partition(' ')
+    if unit != 'bytes':
+        return None, None
+    span, _, total = spec.partition('/')
+    start = span.split('-')[0]
+    return (int(start) if start.isdigit() else None), (int(total) if total.isdigit() else None)
+
+
+def validator(response):
+    """The If-Range value that identifies the version of a response: a strong ETag, else Last-Modified."""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on path (created if missing) across processes."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ChecksumError(Exception):
+    pass
+
+
+class AssetManager(object):
+    """
+    Downloads model assets (configs, checkpoints, speaker embeddings) into a
+    local content-addressed cache.
+
+    Layout of cache_dir:
+        blobs/<sha256>       downloaded files, named by their content hash
+        refs/<sha256(url)>   the content hash a URL resolved to
+        partial/<sha256(url)>  unfinished downloads, resumed with a Range request
+        partial/<sha256(url)>.validator  ETag or Last-Modified the download started from
+        partial/<sha256(url)>.lock       held by the process downloading the URL
+
+    Downloads are streamed to disk in chunk_size pieces and hashed on the
+    way. A file only enters blobs/ through an atomic rename once it is
+    complete and, when an expected sha256 is given, verified; an interrupted
+    download is picked up where it stopped on the next attempt, provided the
+    server confirms (If-Range) that the file has not changed since. One
+    process at a time downloads a URL; the others wait for it and use its
+    result.
+    """
+
+    def __init__(self, cache_dir=None, chunk_size=1 << 20, max_workers=4, retries=3, timeout=60, session=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get('OPENVOICE_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'openvoice'))
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout
+        self.session = session
+        for name in ('blobs', 'refs', 'partial'):
+            os.makedirs(os.path.join(cache_dir, name), exist_ok=True)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _session(self):
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        return self.session
+
+    def _url_lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def blob_path(self, digest):
+        return os.path.join(self.cache_dir, 'blobs', digest)
+
+    def cached(self, url, sha256=None):
+        """Path of the cached blob for url, or None if it is not (validly) cached."""
+        if sha256 is not None:
+            path = self.blob_path(sha256)
+            return path if os.path.isfile(path) else None
+        ref_path = os.path.join(self.cache_dir, 'refs', url_key(url))
+        if not os.path.isfile(ref_path):
+            return None
+        with open(ref_path, 'r', encoding='utf-8') as f:
+            path = self.blob_path(f.read().strip())
+        return path if os.path.isfile(path) else None
+
+    def fetch(self, url, sha256=None, save_path=None):
+        """
+        Local path of url, downloading it if it is not cached yet.
+        sha256: expected hex digest; a mismatch raises ChecksumError
+        save_path: also place the file there (hard link, or copy across filesystems)
+        """
+        key = url_key(url)
+        with self._url_lock(key):
+            path = self.cached(url, sha256)
+            if path is None:
+                with file_lock(os.path.join(self.cache_dir, 'partial', key + '.lock')):
+                    # Another process may have finished it while this one waited.
+                    path = self.cached(url, sha256)
+                    if path is None:
+                        path = self._download(url, key, sha256)
+        if save_path is not None:
+            self._place(path, save_path)
+            return save_path
+        return path
+
+    def fetch_many(self, items, max_workers=None):
+        """
+        items: urls or (url, save_path) / (url, save_path, sha256) tuples
+        Downloads in parallel and returns the local paths in input order.
+        """
+        items = [(item,) if isinstance(item, str) else tuple(item) for item in items]
+
+        def fetch(item):
+            url = item[0]
+            save_path = item[1] if len(item) > 1 else None
+            sha256 = item[2] if len(item) > 2 else None
+            return self.fetch(url, sha256=sha256, save_path=save_path)
+
+        max_workers = max_workers or self.max_workers
+        if max_workers <= 1 or len(items) <= 1:
+            return [fetch(item) for item in items]
+        with ThreadPoolExecutor(max_workers) as pool:
+            return list(pool.map(fetch, items))
+
+    def resolve(self, path_or_url, sha256=None):
+        """Local paths pass through; http(s) URLs are fetched into the cache."""
+        if path_or_url.startswith('http://') or path_or_url.startswith('https://'):
+            return self.fetch(path_or_url, sha256=sha256)
+        return path_or_url
+
+    def _download(self, url, key, sha256):
+        part_path = os.path.join(self.cache_dir, 'partial', key)
+        for attempt in range(self.retries + 1):
+            try:
+                digest = self._stream(url, part_path)
+                break
+            except (IOError, OSError) as e:
+                # requests' exceptions are IOErrors. Client errors (404, 403, ...)
+                # will not go away; anything else is retried, resuming the
+                # partial file.
+                response = getattr(e, 'response', None)
+                if attempt == self.retries or (response is not None and response.status_code < 500):
+                    raise
+                print(f"Download of {url} interrupted ({e}), resuming")
+
+        if os.path.isfile(part_path + '.validator'):
+            os.remove(part_path + '.validator')
+        if sha256 is not None and digest != sha256:
+            os.remove(part_path)
+            raise ChecksumError(f"{url}: expected sha256 {sha256}, got {digest}")
+
+        blob_path = self.blob_path(digest)
+        os.replace(part_path, blob_path)
+        ref_path = os.path.join(self.cache_dir, 'refs', key)
+        with open(ref_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(digest)
+        os.replace(ref_path + '.tmp', ref_path)
+        return blob_path
+
+    def _stream(self, url, part_path):
+        """Append the rest of url to part_path; returns the sha256 of the whole file."""
+        h = hashlib.sha256()
+        offset = 0
+        validator_path = part_path + '.validator'
+        stored_validator = None
+        if os.path.isfile(validator_path):
+            with open(validator_path, 'r', encoding='utf-8') as f:
+                stored_validator = f.read().strip() or None
+        if os.path.isfile(part_path) and stored_validator is not None:
+            offset = os.path.getsize(part_path)
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    h.update(chunk)
+        # Without a validator there is no telling whether the partial file
+        # still belongs to the remote one, so it is downloaded again.
+
+        headers = {'Range': f'bytes={offset}-', 'If-Range': stored_validator} if offset > 0 else {}
+        with self._session().get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+            if offset > 0 and r.status_code == 416:
+                if content_range(r)[1] == offset:
+                    # Nothing left to send: the partial file is already complete.
+                    return h.hexdigest()
+                # The partial file is longer than the remote one, or the
+                # server did not say how long that is; start over.
+                os.remove(part_path)
+                return self._stream(url, part_path)
+            r.raise_for_status()
+            if offset > 0 and r.status_code == 206 and content_range(r)[0] != offset:
+                # Not the range that was asked for; start over.
+                os.remove(part_path)
+                return self._stream(url, part_path)
+            if offset > 0 and r.status_code != 206:
+                # The file changed (If-Range did not match) or the server
+                # ignored the Range header; start over.
+                h = hashlib.sha256()
+                offset = 0
+            if offset == 0:
+                with open(validator_path, 'w', encoding='utf-8') as f:
+                    f.write(validator(r) or '')
+            with open(part_path, 'ab' if offset > 0 else 'wb') as f:
+                for chunk in r.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def _place(path, save_path):
+        save_dir = os.path.dirname(save_path)
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+        tmp_path = save_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, save_path)
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_asset_manager():
+    """The process-wide AssetManager (cache directory from $OPENVOICE_CACHE)."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = AssetManager()
+        return _default_manager
@@ -0,0 +1,108 @@
+import math
+import base64
+import hashlib
+import functools
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=32)
+def resample_filter(orig_sr, target_sr):
+    """Windowed-sinc (Kaiser) low-pass FIR for polyphase resampling, designed once per rate pair."""
+    from scipy.signal import firwin
+
+    g = math.gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1. / max_rate, window=('kaiser', 5.0)).astype(np.float32)
+    h.setflags(write=False)
+    return up, down, h
+
+
+def resample(y, orig_sr, target_sr):
+    """Resample along the last axis, so [channels, samples] is handled in one call."""
+    if orig_sr == target_sr:
+        return y
+    from scipy.signal import resample_poly
+
+    up, down, h = resample_filter(int(orig_sr), int(target_sr))
+    return resample_poly(y, up, down, axis=-1, window=h).astype(np.float32, copy=False)
+
+
+def audio_hash(array):
+    hash_value = hashlib.sha256(array.tobytes()).digest()
+    base64_value = base64.b64encode(hash_value)
+    return base64_value.decode('utf-8')[:16].replace('/', '_^')
+
+
+class DecodedAudio(object):
+    """
+    An audio file decoded exactly once.
+
+    data is float32 [channels, samples] at the native rate. mono, resampled
+    versions and the content hash are all derived from it and cached.
+    """
+
+    def __init__(self, data, sample_rate, path=None):
+        if data.ndim == 1:
+            data = data[None]
+        self.data = data
+        self.sample_rate = sample_rate
+        self.path = path
+        self._mono = None
+        self._resampled = {}
+        self._hash = None
+
+    @property
+    def mono(self):
+        if self._mono is None:
+            if self.data.shape[0] == 1:
+                self._mono = self.data[0]
+            else:
+                self._mono = np.mean(self.data, axis=0)
+        return self._mono
+
+    @property
+    def duration(self):
+        return self.data.shape[-1] / self.sample_rate
+
+    @property
+    def content_hash(self):
+        # Same value se_extractor.hash_numpy_array used to compute from librosa.load(sr=None).
+        if self._hash is None:
+            self._hash = audio_hash(self.mono)
+        return self._hash
+
+    def resample(self, sample_rate):
+        """Mono float32 waveform at sample_rate."""
+        if sample_rate == self.sample_rate:
+            return self.mono
+        if sample_rate not in self._resampled:
+            self._resampled[sample_rate] = resample(self.mono, self.sample_rate, sample_rate)
+        return self._resampled[sample_rate]
+
+
+def load_audio(path):
+    import soundfile
+
+    try:
+        data, sample_rate = soundfile.read(path, dtype='float32', always_2d=True)
+        data = np.ascontiguousarray(data.T)
+    except RuntimeError:
+        # Formats libsndfile cannot decode go through librosa/audioread.
+        import librosa
+        data, sample_rate = librosa.load(path, sr=None, mono=False)
+    return DecodedAudio(data, sample_rate, path=path)
+
+
+def save_audio(path, audio, sample_rate):
+    import soundfile
+
+    soundfile.write(path, audio, sample_rate)
+
+
+def as_decoded_audio(audio):
+    if isinstance(audio, DecodedAudio):
+        return audio
+    return load_audio(audio)
@@ -1,4 +1,8 @@
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import torch
 from torch.nn import functional as F
 
@@ -45,6 +49,30 @@ def rand_gumbel_like(x):
     return g
 
 
+def randn(size, like, generator=None):
+    """
+    Standard normal noise of shape size with like's device and dtype. With a
+    torch.Generator the noise is drawn on the generator's device and moved,
+    so a seeded CPU generator gives the same noise whatever device runs.
+    """
+    if generator is None:
+        return torch.randn(size).to(device=like.device, dtype=like.dtype)
+    return torch.randn(size, generator=generator, device=generator.device).to(device=like.device, dtype=like.dtype)
+
+
+def randn_like(x, generator=None):
+    if generator is None:
+        return torch.randn_like(x)
+    return randn(x.size(), x, generator)
+
+
+def make_generator(seed):
+    """A CPU torch.Generator seeded with seed, or None to use the global RNG."""
+    if seed is None:
+        return None
+    return torch.Generator().manual_seed(int(seed))
+
+
 def slice_segments(x, ids_str, segment_size=4):
     ret = torch.zeros_like(x[:, :, :segment_size])
     for i in range(x.size(0)):
@@ -107,6 +135,20 @@ def fused_add_tanh_sigmoid_multiply(input_a, input_b, n_channels):
     return acts
 
 
+@torch.jit.script
+def fused_add_tanh_sigmoid_multiply_(in_act, cond: Optional[torch.Tensor], n_channels: int):
+    """In-place variant of fused_add_tanh_sigmoid_multiply for inference.
+
+    Overwrites ``in_act`` and returns a view of its first ``n_channels`` channels,
+    so no intermediate tensors are allocated. Not safe under autograd.
+    """
+    if cond is not None:
+        in_act.add_(cond)
+    t_act = in_act[:, :n_channels, :].tanh_()
+    s_act = in_act[:, n_channels:, :].sigmoid_()
+    return t_act.mul_(s_act)
+
+
 def convert_pad_shape(pad_shape):
     layer = pad_shape[::-1]
     pad_shape = [item for sublist in layer for item in sublist]
@@ -125,6 +167,13 @@ def sequence_mask(length, max_length=None):
     return x.unsqueeze(0) < length.unsqueeze(1)
 
 
+def per_row(value, x, dtype=None):
+    """A scalar, or a [b] tensor reshaped to [b, 1, 1] to broadcast over x [b, c, t] (in dtype, default x's)."""
+    if isinstance(value, torch.Tensor) and value.dim() > 0:
+        return value.to(device=x.device, dtype=dtype or x.dtype).view(-1, 1, 1)
+    return value
+
+
 def generate_path(duration, mask):
     """
     duration: [b, 1, t_x]
@@ -158,3 +207,53 @@ def clip_grad_value_(parameters, clip_value, norm_type=2):
             p.grad.data.clamp_(min=-clip_value, max=clip_value)
     total_norm = total_norm ** (1.0 / norm_type)
     return total_norm
+
+
+_worker_state = threading.local()
+
+
+def _init_worker(num_threads):
+    _worker_state.active = True
+    torch.set_num_threads(num_threads)
+
+
+def _autocast_state(device_type):
+    """(enabled, dtype) of autocast for device_type in the calling thread."""
+    if hasattr(torch, 'get_autocast_dtype'):
+        return torch.is_autocast_enabled(device_type), torch.get_autocast_dtype(device_type)
+    # torch < 2.4 (requirements.txt pins 2.2) only has the per-device functions.
+    if device_type == 'cpu':
+        return torch.is_autocast_cpu_enabled(), torch.get_autocast_cpu_dtype()
+    return torch.is_autocast_enabled(), torch.get_autocast_gpu_dtype()
+
+
+def parallel_map(fn, items, num_workers):
+    """
+    [fn(item) for item in items] on num_workers threads, in input order.
+
+    Each worker sets torch.set_num_threads to its share of the intra-op
+    threads. Calls made from inside a worker run sequentially, so nested
+    parallel sections do not oversubscribe the cores.
+    """
+    items = list(items)
+    if num_workers <= 1 or len(items) <= 1 or getattr(_worker_state, 'active', False):
+        return [fn(item) for item in items]
+    num_workers = min(num_workers, len(items))
+    num_threads = torch.get_num_threads()
+    # Grad and autocast modes are thread-local; carry the caller's into the workers.
+    grad_enabled = torch.is_grad_enabled()
+    cpu_autocast, cuda_autocast = _autocast_state('cpu'), _autocast_state('cuda')
+
+    def call(item):
+        with torch.set_grad_enabled(grad_enabled), \
+                torch.autocast('cpu', enabled=cpu_autocast[0], dtype=cpu_autocast[1]), \
+                torch.autocast('cuda', enabled=cuda_autocast[0], dtype=cuda_autocast[1]):
+            return fn(item)
+
+    try:
+        with ThreadPoolExecutor(num_workers, initializer=_init_worker,
+                                initargs=(max(1, num_threads // num_workers),)) as pool:
+            return list(pool.map(call, items))
+    finally:
+        # Builds without per-thread OpenMP state apply set_num_threads process-wide.
+        torch.set_num_threads(num_threads)
@@ -0,0 +1,208 @@
+import io
+import struct
+
+import numpy as np
+
+
+class _ByteSink(object):
+    """
+    File-like target for soundfile that hands out what was written since the
+    last drain() and then forgets it, reusing one bytearray. Writes that land
+    before the drained position (header rewrites at close) are dropped; the
+    header that went out first says "length unknown", which streaming
+    decoders accept.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0  # stream position of buffer[0]
+        self.position = 0
+        self.length = 0
+
+    def write(self, data):
+        data = memoryview(data).cast('B')
+        n = len(data)
+        start = self.position - self.offset
+        if start < 0:
+            data = data[min(-start, n):]
+            start = 0
+        end = start + len(data)
+        if end > len(self.buffer):
+            self.buffer.extend(bytes(end - len(self.buffer)))
+        self.buffer[start:end] = data
+        self.position += n
+        self.length = max(self.length, self.position)
+        return n
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            offset += self.length
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+    def read(self, size=-1):
+        return b''
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.offset += len(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+class _OffsetFile(object):
+    """
+    The seekable file f seen from offset start on, for soundfile, which
+    seeks to absolute positions when it completes a header.
+    """
+
+    def __init__(self, f, start):
+        self.f = f
+        self.start = start
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            offset += self.start
+        return self.f.seek(offset, whence) - self.start
+
+    def tell(self):
+        return self.f.tell() - self.start
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+
+class AudioStreamEncoder(object):
+    """
+    Encodes a waveform chunk by chunk.
+
+    write(chunk) takes float32 samples in [-1, 1] and returns the bytes that
+    can be sent right away; close() returns whatever is left. Formats:
+        'pcm16'  raw little-endian 16-bit samples
+        'wav'    PCM16 WAV whose header carries placeholder sizes, written
+                 before the first samples; finalize_wav() patches them when
+                 the output is a seekable file
+        'flac'   16-bit FLAC through soundfile, frames emitted as they fill
+
+    For pcm16/wav the returned memoryview points into a buffer that is reused
+    by the next write(); send or copy it before writing again.
+    """
+
+    formats = ('pcm16', 'wav', 'flac')
+
+    def __init__(self, sample_rate, format='wav', channels=1):
+        assert format in self.formats, f"format {format} is not supported"
+        self.sample_rate = sample_rate
+        self.format = format
+        self.channels = channels
+        self.header_sent = False
+        self._float = np.zeros(0, dtype=np.float32)
+        self._int16 = np.zeros(0, dtype='<i2')
+        if format == 'flac':
+            import soundfile
+
+            self._sink = _ByteSink()
+            self._sf = soundfile.SoundFile(self._sink, 'w', samplerate=sample_rate, channels=channels,
+                                           format='FLAC', subtype='PCM_16')
+
+    def wav_header(self, data_bytes=0xFFFFFFFF - 36):
+        block_align = 2 * self.channels
+        return struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', min(36 + data_bytes, 0xFFFFFFFF), b'WAVE',
+            b'fmt ', 16, 1, self.channels, self.sample_rate,
+            self.sample_rate * block_align, block_align, 16,
+            b'data', data_bytes,
+        )
+
+    def _to_pcm16(self, chunk):
+        n = chunk.size
+        if self._float.size < n:
+            self._float = np.empty(n, dtype=np.float32)
+            self._int16 = np.empty(n, dtype='<i2')
+        f = self._float[:n]
+        np.multiply(chunk.reshape(-1), 32767., out=f)
+        np.clip(f, -32768., 32767., out=f)
+        np.rint(f, out=f)
+        out = self._int16[:n]
+        np.copyto(out, f, casting='unsafe')
+        return memoryview(out).cast('B')
+
+    def write(self, chunk):
+        """chunk: float32 [n] (mono) or [n, channels]"""
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if self.format == 'flac':
+            self._sf.write(chunk)
+            return self._sink.drain()
+        data = self._to_pcm16(chunk)
+        if self.format == 'wav' and not self.header_sent:
+            self.header_sent = True
+            return memoryview(self.wav_header() + data.tobytes())
+        return data
+
+    def close(self):
+        if self.format == 'flac':
+            self._sf.close()
+            return self._sink.drain()
+        if self.format == 'wav' and not self.header_sent:
+            self.header_sent = True
+            return self.wav_header(0)
+        return b''
+
+    def finalize_wav(self, f, data_bytes, start=0):
+        """Rewrite the size fields of a WAV stream written to the seekable file f from offset start."""
+        position = f.tell()
+        f.seek(start)
+        f.write(self.wav_header(data_bytes)[:44])
+        f.seek(position)
+
+
+def encode_chunks(chunks, sample_rate, format='wav'):
+    """Yield encoded bytes for an iterable of float32 chunks as they arrive."""
+    encoder = AudioStreamEncoder(sample_rate, format=format)
+    for chunk in chunks:
+        data = encoder.write(chunk)
+        if len(data):
+            yield bytes(data)
+    tail = encoder.close()
+    if len(tail):
+        yield bytes(tail)
+
+
+def write_chunks(chunks, f, sample_rate, format='wav'):
+    """
+    Stream chunks into the binary file object f; returns the bytes written.
+    When f is seekable the headers are completed at the end (WAV sizes, FLAC
+    length and checksum), so the result is an ordinary file.
+    """
+    seekable = f.seekable()
+    start = f.tell() if seekable else 0
+    if format == 'flac' and seekable:
+        import soundfile
+
+        with soundfile.SoundFile(_OffsetFile(f, start), 'w', samplerate=sample_rate, channels=1,
+                                 format='FLAC', subtype='PCM_16') as out:
+            for chunk in chunks:
+                out.write(np.asarray(chunk, dtype=np.float32))
+        f.seek(0, 2)
+        return f.tell() - start
+    encoder = AudioStreamEncoder(sample_rate, format=format)
+    written = 0
+    for chunk in chunks:
+        written += f.write(encoder.write(chunk))
+    written += f.write(encoder.close())
+    if format == 'wav' and seekable:
+        encoder.finalize_wav(f, written - 44, start=start)
+    return written
+
+
+def encode_audio(audio, sample_rate, format='wav'):
+    """A whole waveform as one complete file (or raw PCM16) in memory."""
+    f = io.BytesIO()
+    write_chunks([audio], f, sample_rate, format=format)
+    return f.getvalue()
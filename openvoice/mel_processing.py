@@ -1,6 +1,9 @@
+import math
+import threading
 import torch
 import torch.utils.data
-from librosa.filters import mel as librosa_mel_fn
+
+from openvoice import commons
 
 MAX_WAV_VALUE = 32768.0
 
@@ -35,149 +38,205 @@ def spectral_de_normalize_torch(magnitudes):
 
 mel_basis = {}
 hann_window = {}
+# Guards filling the caches in this module; lookups of existing entries take no lock.
+_cache_lock = threading.Lock()
+
+
+def get_hann_window(win_size, dtype, device):
+    key = (win_size, dtype, device)
+    window = hann_window.get(key)
+    if window is None:
+        with _cache_lock:
+            window = hann_window.get(key)
+            if window is None:
+                window = torch.hann_window(win_size, dtype=dtype, device=device)
+                hann_window[key] = window
+    return window
 
 
-def spectrogram_torch(y, n_fft, sampling_rate, hop_size, win_size, center=False):
-    if torch.min(y) < -1.1:
+def check_wav_range(y, limit=1.1):
+    # Forces two reductions and a host sync, so only call it when debugging.
+    if torch.min(y) < -limit:
         print("min value is ", torch.min(y))
-    if torch.max(y) > 1.1:
+    if torch.max(y) > limit:
         print("max value is ", torch.max(y))
 
-    global hann_window
-    dtype_device = str(y.dtype) + "_" + str(y.device)
-    wnsize_dtype_device = str(win_size) + "_" + dtype_device
-    if wnsize_dtype_device not in hann_window:
-        hann_window[wnsize_dtype_device] = torch.hann_window(win_size).to(
-            dtype=y.dtype, device=y.device
-        )
-
-    y = torch.nn.functional.pad(
-        y.unsqueeze(1),
-        (int((n_fft - hop_size) / 2), int((n_fft - hop_size) / 2)),
-        mode="reflect",
-    )
-    y = y.squeeze(1)
 
+def stft_magnitude(y, n_fft, hop_size, win_size, center=False):
     spec = torch.stft(
         y,
         n_fft,
         hop_length=hop_size,
         win_length=win_size,
-        window=hann_window[wnsize_dtype_device],
+        window=get_hann_window(win_size, y.dtype, y.device),
         center=center,
         pad_mode="reflect",
         normalized=False,
         onesided=True,
-        return_complex=False,
+        return_complex=True,
     )
+    return torch.sqrt(spec.real.square() + spec.imag.square() + 1e-6)
 
-    spec = torch.sqrt(spec.pow(2).sum(-1) + 1e-6)
-    return spec
 
+def spectrogram_torch(y, n_fft, sampling_rate, hop_size, win_size, center=False, check_range=False):
+    if check_range:
+        check_wav_range(y)
 
-def spectrogram_torch_conv(y, n_fft, sampling_rate, hop_size, win_size, center=False):
-    # if torch.min(y) < -1.:
-    #     print('min value is ', torch.min(y))
-    # if torch.max(y) > 1.:
-    #     print('max value is ', torch.max(y))
+    y = torch.nn.functional.pad(
+        y.unsqueeze(1),
+        (int((n_fft - hop_size) / 2), int((n_fft - hop_size) / 2)),
+        mode="reflect",
+    )
+    y = y.squeeze(1)
 
-    global hann_window
-    dtype_device = str(y.dtype) + '_' + str(y.device)
-    wnsize_dtype_device = str(win_size) + '_' + dtype_device
-    if wnsize_dtype_device not in hann_window:
-        hann_window[wnsize_dtype_device] = torch.hann_window(win_size).to(dtype=y.dtype, device=y.device)
+    return stft_magnitude(y, n_fft, hop_size, win_size, center=center)
 
-    y = torch.nn.functional.pad(y.unsqueeze(1), (int((n_fft-hop_size)/2), int((n_fft-hop_size)/2)), mode='reflect')
-    
-    # ******************** original ************************#
-    # y = y.squeeze(1)
-    # spec1 = torch.stft(y, n_fft, hop_length=hop_size, win_length=win_size, window=hann_window[wnsize_dtype_device],
-    #                   center=center, pad_mode='reflect', normalized=False, onesided=True, return_complex=False)
 
-    # ******************** ConvSTFT ************************#
-    freq_cutoff = n_fft // 2 + 1
-    fourier_basis = torch.view_as_real(torch.fft.fft(torch.eye(n_fft)))
-    forward_basis = fourier_basis[:freq_cutoff].permute(2, 0, 1).reshape(-1, 1, fourier_basis.shape[1])
-    forward_basis = forward_basis * torch.as_tensor(librosa.util.pad_center(torch.hann_window(win_size), size=n_fft)).float()
+def spectrogram_torch_batch(y, y_lengths, n_fft, sampling_rate, hop_size, win_size, center=False, check_range=False, stft=None):
+    """
+    y: list of 1-D waveforms, or a padded [b, t] batch with y_lengths [b]
+    stft: optional ConvSTFT to use instead of torch.stft
+    returns spec [b, n_fft // 2 + 1, t'], spec_lengths [b], spec_mask [b, 1, t']
 
-    import torch.nn.functional as F
+    Every item is reflect-padded at its own end, so each row matches
+    spectrogram_torch on the unpadded waveform for the first spec_lengths frames.
+    """
+    if isinstance(y, (list, tuple)):
+        waves = list(y)
+        y_lengths = torch.LongTensor([w.size(-1) for w in waves])
+    else:
+        waves = [y[i, : int(l)] for i, l in enumerate(y_lengths.tolist())]
+        y_lengths = y_lengths.cpu().long()
+
+    if check_range:
+        for w in waves:
+            check_wav_range(w)
+
+    pad = int((n_fft - hop_size) / 2)
+    if center:
+        # torch.stft would pad the zero tail of short items; pad each item here instead.
+        pad_center = n_fft // 2
+    else:
+        pad_center = 0
+    max_len = int(y_lengths.max())
+    batch = waves[0].new_zeros(len(waves), max_len + 2 * (pad + pad_center))
+    for i, w in enumerate(waves):
+        w = torch.nn.functional.pad(w.view(1, 1, -1), (pad, pad), mode="reflect")
+        if center:
+            w = torch.nn.functional.pad(w, (pad_center, pad_center), mode="reflect")
+        batch[i, : w.size(-1)] = w.view(-1)
+
+    if stft is None:
+        spec = stft_magnitude(batch, n_fft, hop_size, win_size, center=False)
+    else:
+        assert not center
+        spec = stft.magnitude(batch)
+    spec_lengths = (y_lengths + 2 * (pad + pad_center) - n_fft) // hop_size + 1
+    spec_lengths = spec_lengths.to(spec.device)
+    spec_mask = torch.unsqueeze(commons.sequence_mask(spec_lengths, spec.size(-1)), 1).to(spec.dtype)
+    return spec * spec_mask, spec_lengths, spec_mask
+
+
+class ConvSTFT(torch.nn.Module):
+    """
+    Magnitude spectrogram as a strided conv1d over a precomputed, windowed
+    Fourier basis. Matches spectrogram_torch (center=False) and, unlike
+    torch.stft, exports to ONNX and TorchScript as plain conv ops.
+    """
 
-    # if center:
-    #     signal = F.pad(y[:, None, None, :], (n_fft // 2, n_fft // 2, 0, 0), mode = 'reflect').squeeze(1)
+    def __init__(self, n_fft, hop_size, win_size):
+        super().__init__()
+        self.n_fft = n_fft
+        self.hop_size = hop_size
+        self.win_size = win_size
+        self.pad = int((n_fft - hop_size) / 2)
+        self.freq_cutoff = n_fft // 2 + 1
+
+        window = torch.hann_window(win_size, dtype=torch.float64)
+        left = (n_fft - win_size) // 2
+        window = torch.nn.functional.pad(window, (left, n_fft - win_size - left))
+        k = torch.arange(self.freq_cutoff, dtype=torch.float64).unsqueeze(1)
+        n = torch.arange(n_fft, dtype=torch.float64).unsqueeze(0)
+        angle = 2 * math.pi * k * n / n_fft
+        basis = torch.cat([torch.cos(angle), -torch.sin(angle)], 0) * window
+        self.register_buffer("forward_basis", basis.float().unsqueeze(1), persistent=False)
+
+    def project(self, y):
+        return torch.nn.functional.conv1d(y.unsqueeze(1), self.forward_basis.to(y.dtype), stride=self.hop_size)
+
+    def magnitude(self, y):
+        """y: [b, t] already padded -> [b, n_fft // 2 + 1, frames]"""
+        if torch.jit.is_scripting():
+            # Scripted modules run without autocast, whose device argument must be a constant there.
+            spec = self.project(y)
+        else:
+            # Kept in fp32 under autocast, like torch.stft.
+            with torch.autocast(y.device.type, enabled=False):
+                spec = self.project(y)
+        real = spec[:, : self.freq_cutoff, :]
+        imag = spec[:, self.freq_cutoff :, :]
+        return torch.sqrt(real.square() + imag.square() + 1e-6)
+
+    def forward(self, y):
+        y = torch.nn.functional.pad(y.unsqueeze(1), (self.pad, self.pad), mode="reflect")
+        return self.magnitude(y.squeeze(1))
+
+
+conv_stft = {}
+
+
+def get_conv_stft(n_fft, hop_size, win_size, device):
+    key = (n_fft, hop_size, win_size, device)
+    module = conv_stft.get(key)
+    if module is None:
+        with _cache_lock:
+            module = conv_stft.get(key)
+            if module is None:
+                module = ConvSTFT(n_fft, hop_size, win_size).to(device)
+                conv_stft[key] = module
+    return module
+
+
+def spectrogram_torch_conv(y, n_fft, sampling_rate, hop_size, win_size, center=False, check_range=False):
     assert center is False
-
-    forward_transform_squared = F.conv1d(y, forward_basis.to(y.device), stride = hop_size)
-    spec2 = torch.stack([forward_transform_squared[:, :freq_cutoff, :], forward_transform_squared[:, freq_cutoff:, :]], dim = -1)
-
-
-    # ******************** Verification ************************#
-    spec1 = torch.stft(y.squeeze(1), n_fft, hop_length=hop_size, win_length=win_size, window=hann_window[wnsize_dtype_device],
-                      center=center, pad_mode='reflect', normalized=False, onesided=True, return_complex=False)
-    assert torch.allclose(spec1, spec2, atol=1e-4)
-
-    spec = torch.sqrt(spec2.pow(2).sum(-1) + 1e-6)
-    return spec
+    if check_range:
+        check_wav_range(y)
+    return get_conv_stft(n_fft, hop_size, win_size, y.device)(y)
+
+
+def get_mel_basis(sampling_rate, n_fft, num_mels, fmin, fmax, dtype, device):
+    key = (sampling_rate, n_fft, num_mels, fmin, fmax, dtype, device)
+    basis = mel_basis.get(key)
+    if basis is None:
+        with _cache_lock:
+            basis = mel_basis.get(key)
+            if basis is None:
+                # librosa is only needed here, so importing this module does not load it.
+                from librosa.filters import mel as librosa_mel_fn
+                mel = librosa_mel_fn(sr=sampling_rate, n_fft=n_fft, n_mels=num_mels, fmin=fmin, fmax=fmax)
+                basis = torch.from_numpy(mel).to(dtype=dtype, device=device)
+                mel_basis[key] = basis
+    return basis
 
 
 def spec_to_mel_torch(spec, n_fft, num_mels, sampling_rate, fmin, fmax):
-    global mel_basis
-    dtype_device = str(spec.dtype) + "_" + str(spec.device)
-    fmax_dtype_device = str(fmax) + "_" + dtype_device
-    if fmax_dtype_device not in mel_basis:
-        mel = librosa_mel_fn(sampling_rate, n_fft, num_mels, fmin, fmax)
-        mel_basis[fmax_dtype_device] = torch.from_numpy(mel).to(
-            dtype=spec.dtype, device=spec.device
-        )
-    spec = torch.matmul(mel_basis[fmax_dtype_device], spec)
+    basis = get_mel_basis(sampling_rate, n_fft, num_mels, fmin, fmax, spec.dtype, spec.device)
+    spec = torch.matmul(basis, spec)
     spec = spectral_normalize_torch(spec)
     return spec
 
 
 def mel_spectrogram_torch(
-    y, n_fft, num_mels, sampling_rate, hop_size, win_size, fmin, fmax, center=False
+    y, n_fft, num_mels, sampling_rate, hop_size, win_size, fmin, fmax, center=False, check_range=False
 ):
-    if torch.min(y) < -1.0:
-        print("min value is ", torch.min(y))
-    if torch.max(y) > 1.0:
-        print("max value is ", torch.max(y))
+    if check_range:
+        check_wav_range(y, limit=1.0)
 
-    global mel_basis, hann_window
-    dtype_device = str(y.dtype) + "_" + str(y.device)
-    fmax_dtype_device = str(fmax) + "_" + dtype_device
-    wnsize_dtype_device = str(win_size) + "_" + dtype_device
-    if fmax_dtype_device not in mel_basis:
-        mel = librosa_mel_fn(sampling_rate, n_fft, num_mels, fmin, fmax)
-        mel_basis[fmax_dtype_device] = torch.from_numpy(mel).to(
-            dtype=y.dtype, device=y.device
-        )
-    if wnsize_dtype_device not in hann_window:
-        hann_window[wnsize_dtype_device] = torch.hann_window(win_size).to(
-            dtype=y.dtype, device=y.device
-        )
+    basis = get_mel_basis(sampling_rate, n_fft, num_mels, fmin, fmax, y.dtype, y.device)
 
-    y = torch.nn.functional.pad(
-        y.unsqueeze(1),
-        (int((n_fft - hop_size) / 2), int((n_fft - hop_size) / 2)),
-        mode="reflect",
-    )
-    y = y.squeeze(1)
+    spec = spectrogram_torch(y, n_fft, sampling_rate, hop_size, win_size, center=center)
 
-    spec = torch.stft(
-        y,
-        n_fft,
-        hop_length=hop_size,
-        win_length=win_size,
-        window=hann_window[wnsize_dtype_device],
-        center=center,
-        pad_mode="reflect",
-        normalized=False,
-        onesided=True,
-        return_complex=False,
-    )
-
-    spec = torch.sqrt(spec.pow(2).sum(-1) + 1e-6)
-
-    spec = torch.matmul(mel_basis[fmax_dtype_device], spec)
+    spec = torch.matmul(basis, spec)
     spec = spectral_normalize_torch(spec)
 
-    return spec
\ No newline at end of file
+    return spec
@@ -132,7 +132,7 @@ class StochasticDurationPredictor(nn.Module):
 		if gin_channels != 0:
 			self.cond = nn.Conv1d(gin_channels, filter_channels, 1)
 
-	def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0):
+	def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0, generator=None):
 		x = torch.detach(x)
 		x = self.pre(x)
 		if g is not None:
@@ -149,7 +149,7 @@ class StochasticDurationPredictor(nn.Module):
 			h_w = self.post_pre(w)
 			h_w = self.post_convs(h_w, x_mask)
 			h_w = self.post_proj(h_w) * x_mask
-			e_q = torch.randn(w.size(0), 2, w.size(2)).to(device=x.device, dtype=x.dtype) * x_mask
+			e_q = commons.randn((w.size(0), 2, w.size(2)), x, generator) * x_mask
 			z_q = e_q
 			for flow in self.post_flows:
 				z_q, logdet_q = flow(z_q, x_mask, g=(x + h_w))
@@ -172,7 +172,7 @@ class StochasticDurationPredictor(nn.Module):
 		else:
 			flows = list(reversed(self.flows))
 			flows = flows[:-2] + [flows[-1]] # remove a useless vflow
-			z = torch.randn(x.size(0), 2, x.size(2)).to(device=x.device, dtype=x.dtype) * noise_scale
+			z = commons.randn((x.size(0), 2, x.size(2)), x, generator) * noise_scale
 			for flow in flows:
 				z = flow(z, x_mask, g=x, reverse=reverse)
 			z0, z1 = torch.split(z, [1, 1], 1)
@@ -209,7 +209,7 @@ class PosteriorEncoder(nn.Module):
         )
         self.proj = nn.Conv1d(hidden_channels, out_channels * 2, 1)
 
-    def forward(self, x, x_lengths, g=None, tau=1.0):
+    def forward(self, x, x_lengths, g=None, tau=1.0, generator=None):
         x_mask = torch.unsqueeze(commons.sequence_mask(x_lengths, x.size(2)), 1).to(
             x.dtype
         )
@@ -217,7 +217,7 @@ class PosteriorEncoder(nn.Module):
         x = self.enc(x, x_mask, g=g)
         stats = self.proj(x) * x_mask
         m, logs = torch.split(stats, self.out_channels, dim=1)
-        z = (m + torch.randn_like(m) * tau * torch.exp(logs)) * x_mask
+        z = (m + commons.randn_like(m, generator) * tau * torch.exp(logs)) * x_mask
         return z, m, logs, x_mask
 
 
@@ -236,6 +236,7 @@ class Generator(torch.nn.Module):
         super(Generator, self).__init__()
         self.num_kernels = len(resblock_kernel_sizes)
         self.num_upsamples = len(upsample_rates)
+        self.upsample_rates = upsample_rates
         self.conv_pre = Conv1d(
             initial_channel, upsample_initial_channel, 7, 1, padding=3
         )
@@ -269,20 +270,95 @@ class Generator(torch.nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, upsample_initial_channel, 1)
 
-    def forward(self, x, g=None):
+        # Chunked decoding (see forward_chunked) when set and not training.
+        # With num_workers > 1 chunks are decoded on that many threads; a
+        # latent is then split even without chunk_size.
+        self.chunk_size = None
+        self.chunks_per_batch = 1
+        self.num_workers = 1
+
+    def receptive_field(self):
+        """One-sided receptive field in input frames: output samples of frame t
+        depend only on frames t - r .. t + r."""
+        r = self.conv_post.padding[0]
+        for i in reversed(range(self.num_upsamples)):
+            r += max(
+                sum(m.padding[0] for m in block.modules() if isinstance(m, Conv1d))
+                for block in self.resblocks[i * self.num_kernels:(i + 1) * self.num_kernels]
+            )
+            r = math.ceil((r + self.ups[i].kernel_size[0]) / self.upsample_rates[i])
+        return r + self.conv_pre.padding[0]
+
+    def forward(self, x, g=None, x_mask=None):
+        """
+        x_mask: optional [b, 1, t] mask of a padded batch. Padded frames are then
+        kept at zero through every stage, so each row decodes exactly as it
+        would on its own.
+        """
+        if not self.training:
+            chunk_size = self.chunk_size
+            if chunk_size is None and self.num_workers > 1:
+                # One chunk per worker, but not so short that the context dominates.
+                chunk_size = max(math.ceil(x.size(2) / self.num_workers), 4 * self.receptive_field())
+            if chunk_size is not None and x.size(2) > chunk_size:
+                return self.forward_chunked(x, g=g, x_mask=x_mask, chunk_size=chunk_size,
+                                            chunks_per_batch=self.chunks_per_batch,
+                                            num_workers=self.num_workers)
+        return self.forward_full(x, g=g, x_mask=x_mask)
+
+    def forward_chunked(self, x, g=None, x_mask=None, chunk_size=256, chunks_per_batch=1, num_workers=1):
+        """
+        Decode x in chunks of chunk_size frames, each with receptive_field()
+        frames of context on both sides, and keep only each chunk's own
+        samples. Chunks are decoded chunks_per_batch at a time as one batch,
+        so peak activation memory follows chunks_per_batch * chunk_size rather
+        than the length of x. Batches of chunks run on num_workers threads
+        (commons.parallel_map). Matches forward up to float rounding.
+        """
+        n_frames = x.size(2)
+        hop = math.prod(self.upsample_rates)
+        context = self.receptive_field()
+        if x_mask is None:
+            x_mask = x.new_ones(x.size(0), 1, n_frames)
+        width = min(chunk_size + 2 * context, n_frames)
+        spans = [(s, min(s + chunk_size, n_frames)) for s in range(0, n_frames, chunk_size)]
+
+        def decode(group):
+            xs, masks, offsets = [], [], []
+            for s, e in group:
+                a, b = max(0, s - context), min(n_frames, e + context)
+                # Shorter edge windows are zero-padded; the mask keeps that padding inert.
+                xs.append(F.pad(x[:, :, a:b], (0, width - (b - a))))
+                masks.append(F.pad(x_mask[:, :, a:b], (0, width - (b - a))))
+                offsets.append((s - a, e - a))
+            n = len(offsets)
+            o = self.forward_full(torch.cat(xs), g=None if g is None else g.repeat(n, 1, 1),
+                                  x_mask=torch.cat(masks))
+            return [o[j * x.size(0):(j + 1) * x.size(0), :, s * hop:e * hop] for j, (s, e) in enumerate(offsets)]
+
+        groups = [spans[k:k + chunks_per_batch] for k in range(0, len(spans), chunks_per_batch)]
+        outputs = commons.parallel_map(decode, groups, num_workers)
+        return torch.cat([o for group in outputs for o in group], 2)
+
+    def forward_full(self, x, g=None, x_mask=None):
         x = self.conv_pre(x)
         if g is not None:
             x = x + self.cond(g)
+        if x_mask is not None:
+            x = x * x_mask
 
         for i in range(self.num_upsamples):
             x = F.leaky_relu(x, modules.LRELU_SLOPE)
             x = self.ups[i](x)
+            if x_mask is not None:
+                x_mask = torch.repeat_interleave(x_mask, self.upsample_rates[i], dim=2)
+                x = x * x_mask
             xs = None
             for j in range(self.num_kernels):
                 if xs is None:
-                    xs = self.resblocks[i * self.num_kernels + j](x)
+                    xs = self.resblocks[i * self.num_kernels + j](x, x_mask)
                 else:
-                    xs += self.resblocks[i * self.num_kernels + j](x)
+                    xs += self.resblocks[i * self.num_kernels + j](x, x_mask)
             x = xs / self.num_kernels
         x = F.leaky_relu(x)
         x = self.conv_post(x)
@@ -337,27 +413,50 @@ class ReferenceEncoder(nn.Module):
             self.layernorm = None
 
     def forward(self, inputs, mask=None):
+        """
+        inputs --- [N, Ty, n_freqs]
+        mask --- optional [N, 1, Ty] frame mask of a padded batch; padded frames
+                 are then ignored, so each row matches its unpadded encoding.
+        """
         N = inputs.size(0)
 
         out = inputs.view(N, 1, -1, self.spec_channels)  # [N, 1, Ty, n_freqs]
         if self.layernorm is not None:
             out = self.layernorm(out)
 
+        if mask is not None:
+            lengths = mask.sum([1, 2]).long()
+            out = out * mask.unsqueeze(-1)
+
         for conv in self.convs:
             out = conv(out)
             # out = wn(out)
             out = F.relu(out)  # [N, 128, Ty//2^K, n_mels//2^K]
+            if mask is not None:
+                lengths = (lengths - 1) // 2 + 1
+                out_mask = commons.sequence_mask(lengths, out.size(2)).to(out.dtype)
+                out = out * out_mask.view(N, 1, -1, 1)
 
         out = out.transpose(1, 2)  # [N, Ty//2^K, 128, n_mels//2^K]
         T = out.size(1)
         N = out.size(0)
         out = out.contiguous().view(N, T, -1)  # [N, Ty//2^K, 128*n_mels//2^K]
 
-        self.gru.flatten_parameters()
+        if mask is not None:
+            out = nn.utils.rnn.pack_padded_sequence(
+                out, lengths.cpu(), batch_first=True, enforce_sorted=False
+            )
         memory, out = self.gru(out)  # out --- [1, N, 128]
 
         return self.proj(out.squeeze(0))
 
+    def _apply(self, fn, *args, **kwargs):
+        module = super()._apply(fn, *args, **kwargs)
+        # Compact the GRU weights (cuDNN) once, when they move, rather than in
+        # forward, where it would rewrite them under concurrent callers.
+        self.gru.flatten_parameters()
+        return module
+
     def calculate_channels(self, L, kernel_size, stride, pad, n_convs):
         for i in range(n_convs):
             L = (L - kernel_size + 2 * pad) // stride + 1
@@ -464,36 +563,67 @@ class SynthesizerTrn(nn.Module):
             self.emb_g = nn.Embedding(n_speakers, gin_channels)
         self.zero_g = zero_g
 
-    def infer(self, x, x_lengths, sid=None, noise_scale=1, length_scale=1, noise_scale_w=1., sdp_ratio=0.2, max_len=None):
+    def infer(self, x, x_lengths, sid=None, noise_scale=1, length_scale=1, noise_scale_w=1., sdp_ratio=0.2, max_len=None,
+              generator=None):
+        """
+        noise_scale, length_scale, noise_scale_w and sdp_ratio are scalars or
+        [b] tensors, one value per row, so one batch can mix speeds and
+        speakers (sid [b]).
+        generator: torch.Generator for the duration and latent noise; None
+        draws from the global RNG.
+        """
         x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths)
+        noise_scale = commons.per_row(noise_scale, m_p)
+        # m_p is bf16 under autocast; keep what feeds the durations in fp32, like scalars.
+        length_scale = commons.per_row(length_scale, m_p, dtype=torch.float32)
+        noise_scale_w = commons.per_row(noise_scale_w, m_p, dtype=torch.float32)
+        sdp_ratio = commons.per_row(sdp_ratio, m_p, dtype=torch.float32)
         if self.n_speakers > 0:
             g = self.emb_g(sid).unsqueeze(-1) # [b, h, 1]
         else:
             g = None
 
-        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * sdp_ratio \
+        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w, generator=generator) * sdp_ratio \
             + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
 
-        w = torch.exp(logw) * x_mask * length_scale
-        w_ceil = torch.ceil(w)
-        y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
-        y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(x_mask.dtype)
-        attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
-        attn = commons.generate_path(w_ceil, attn_mask)
+        # Durations and the alignment path stay in fp32 under autocast: a bf16
+        # exp/ceil shifts frame counts, and the cumsum in generate_path drifts.
+        with torch.autocast(x.device.type, enabled=False):
+            w = torch.exp(logw.float()) * x_mask * length_scale
+            w_ceil = torch.ceil(w)
+            y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
+            y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(x_mask.dtype)
+            attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+            attn = commons.generate_path(w_ceil, attn_mask)
 
         m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(1, 2) # [b, t', t], [b, t, d] -> [b, d, t']
         logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(1, 2) # [b, t', t], [b, t, d] -> [b, d, t']
 
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        z_p = m_p + commons.randn_like(m_p, generator) * torch.exp(logs_p) * noise_scale
         z = self.flow(z_p, y_mask, g=g, reverse=True)
-        o = self.dec((z * y_mask)[:,:,:max_len], g=g)
+        # Single items have no padding, so the decoder only needs the mask for batches.
+        dec_mask = y_mask[:, :, :max_len] if x.size(0) > 1 else None
+        o = self.dec((z * y_mask)[:,:,:max_len], g=g, x_mask=dec_mask)
         return o, attn, y_mask, (z, z_p, m_p, logs_p)
 
-    def voice_conversion(self, y, y_lengths, sid_src, sid_tgt, tau=1.0):
+    def encode_source(self, y, y_lengths, sid_src, tau=1.0, generator=None):
+        """Target-independent half of voice_conversion: source spectrogram -> z_p."""
         g_src = sid_src
-        g_tgt = sid_tgt
-        z, m_q, logs_q, y_mask = self.enc_q(y, y_lengths, g=g_src if not self.zero_g else torch.zeros_like(g_src), tau=tau)
+        z, m_q, logs_q, y_mask = self.enc_q(y, y_lengths, g=g_src if not self.zero_g else torch.zeros_like(g_src), tau=tau,
+                                            generator=generator)
         z_p = self.flow(z, y_mask, g=g_src)
+        return z, z_p, y_mask
+
+    def decode_target(self, z_p, y_mask, sid_tgt, dec_mask=None):
+        """Target half of voice_conversion: reverse flow and decoder under g_tgt."""
+        g_tgt = sid_tgt
         z_hat = self.flow(z_p, y_mask, g=g_tgt, reverse=True)
-        o_hat = self.dec(z_hat * y_mask, g=g_tgt if not self.zero_g else torch.zeros_like(g_tgt))
+        o_hat = self.dec(z_hat * y_mask, g=g_tgt if not self.zero_g else torch.zeros_like(g_tgt), x_mask=dec_mask)
+        return o_hat, z_hat
+
+    def voice_conversion(self, y, y_lengths, sid_src, sid_tgt, tau=1.0, generator=None):
+        z, z_p, y_mask = self.encode_source(y, y_lengths, sid_src, tau=tau, generator=generator)
+        # Single items have no padding, so the decoder only needs the mask for batches.
+        dec_mask = y_mask if y.size(0) > 1 else None
+        o_hat, z_hat = self.decode_target(z_p, y_mask, sid_tgt, dec_mask=dec_mask)
         return o_hat, y_mask, (z, z_p, z_hat)
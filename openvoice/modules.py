@@ -183,6 +183,9 @@ class WN(torch.nn.Module):
             self.res_skip_layers.append(res_skip_layer)
 
     def forward(self, x, x_mask, g=None, **kwargs):
+        if not self.training and not torch.is_grad_enabled():
+            return self.forward_inference(x, x_mask, g=g)
+
         output = torch.zeros_like(x)
         n_channels_tensor = torch.IntTensor([self.hidden_channels])
 
@@ -209,6 +212,35 @@ class WN(torch.nn.Module):
                 output = output + res_skip_acts
         return output * x_mask
 
+    def forward_inference(self, x, x_mask, g=None):
+        # Same computation as forward, but the residual stream and the skip accumulator
+        # are single buffers updated in place across layers, and the gated activation
+        # is computed inside each layer's conv output instead of new tensors.
+        hidden_channels = self.hidden_channels
+        output = torch.zeros_like(x)
+        x = x.clone()
+
+        if g is not None:
+            g = self.cond_layer(g)
+
+        for i in range(self.n_layers):
+            x_in = self.in_layers[i](x)
+            if g is not None:
+                cond_offset = i * 2 * hidden_channels
+                g_l = g[:, cond_offset : cond_offset + 2 * hidden_channels, :]
+            else:
+                g_l = None
+
+            acts = commons.fused_add_tanh_sigmoid_multiply_(x_in, g_l, hidden_channels)
+
+            res_skip_acts = self.res_skip_layers[i](acts)
+            if i < self.n_layers - 1:
+                x.add_(res_skip_acts[:, :hidden_channels, :]).mul_(x_mask)
+                output.add_(res_skip_acts[:, hidden_channels:, :])
+            else:
+                output.add_(res_skip_acts)
+        return output.mul_(x_mask)
+
     def remove_weight_norm(self):
         if self.gin_channels != 0:
             torch.nn.utils.remove_weight_norm(self.cond_layer)
@@ -6,9 +6,17 @@ from zipfile import ZipFile
 import langid
 from openvoice import se_extractor
 from openvoice.api import BaseSpeakerTTS, ToneColorConverter
+from openvoice.registry import get_model_registry
+from openvoice.response_cache import ResponseCache
+from openvoice.text.token_cache import get_token_cache
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--share", action='store_true', default=False, help="make link public")
+parser.add_argument("--model_memory_mb", type=int, default=None, help="evict least recently used models above this budget")
+parser.add_argument("--seed", type=int, default=None, help="fixed seed: identical requests give identical audio")
+parser.add_argument("--response_cache_dir", type=str, default=None, help="with --seed, keep finished audio on disk here")
+parser.add_argument("--token_cache_path", type=str, default=None, help="sqlite file that keeps sentence tokens across restarts")
+parser.add_argument("--skip_warmup", action='store_true', default=False, help="start serving without warming up the models")
 args = parser.parse_args()
 
 en_ckpt_base = 'checkpoints/base_speakers/EN'
@@ -18,18 +26,24 @@ device = 'cuda' if torch.cuda.is_available() else 'cpu'
 output_dir = 'outputs'
 os.makedirs(output_dir, exist_ok=True)
 
-# load models
-en_base_speaker_tts = BaseSpeakerTTS(f'{en_ckpt_base}/config.json', device=device)
-en_base_speaker_tts.load_ckpt(f'{en_ckpt_base}/checkpoint.pth')
-zh_base_speaker_tts = BaseSpeakerTTS(f'{zh_ckpt_base}/config.json', device=device)
-zh_base_speaker_tts.load_ckpt(f'{zh_ckpt_base}/checkpoint.pth')
-tone_color_converter = ToneColorConverter(f'{ckpt_converter}/config.json', device=device)
-tone_color_converter.load_ckpt(f'{ckpt_converter}/checkpoint.pth')
+# models and speaker embeddings are loaded on first use
+registry = get_model_registry(
+    max_bytes=args.model_memory_mb * 2 ** 20 if args.model_memory_mb else None)
+# repeated prompts are served from here when --seed is set
+response_cache = ResponseCache(cache_dir=args.response_cache_dir)
+get_token_cache(path=args.token_cache_path)
 
-# load speaker embeddings
-en_source_default_se = torch.load(f'{en_ckpt_base}/en_default_se.pth').to(device)
-en_source_style_se = torch.load(f'{en_ckpt_base}/en_style_se.pth').to(device)
-zh_source_se = torch.load(f'{zh_ckpt_base}/zh_default_se.pth').to(device)
+
+def get_base_speaker_tts(ckpt_base):
+    model = registry.get_model(BaseSpeakerTTS, f'{ckpt_base}/config.json', f'{ckpt_base}/checkpoint.pth', device=device)
+    model.response_cache = response_cache
+    return model
+
+
+def get_tone_color_converter():
+    model = registry.get_model(ToneColorConverter, f'{ckpt_converter}/config.json', f'{ckpt_converter}/checkpoint.pth', device=device)
+    model.response_cache = response_cache
+    return model
 
 # This online demo mainly supports English and Chinese
 supported_languages = ['zh', 'en']
@@ -64,8 +78,8 @@ def predict(prompt, style, audio_file_pth, agree):
         )
     
     if language_predicted == "zh":
-        tts_model = zh_base_speaker_tts
-        source_se = zh_source_se
+        tts_model = get_base_speaker_tts(zh_ckpt_base)
+        source_se = registry.get_tensor(f'{zh_ckpt_base}/zh_default_se.pth', device)
         language = 'Chinese'
         if style not in ['default']:
             text_hint += f"[ERROR] The style {style} is not supported for Chinese, which should be in ['default']\n"
@@ -77,11 +91,11 @@ def predict(prompt, style, audio_file_pth, agree):
             )
 
     else:
-        tts_model = en_base_speaker_tts
+        tts_model = get_base_speaker_tts(en_ckpt_base)
         if style == 'default':
-            source_se = en_source_default_se
+            source_se = registry.get_tensor(f'{en_ckpt_base}/en_default_se.pth', device)
         else:
-            source_se = en_source_style_se
+            source_se = registry.get_tensor(f'{en_ckpt_base}/en_style_se.pth', device)
         language = 'English'
         if style not in ['default', 'whispering', 'shouting', 'excited', 'cheerful', 'terrified', 'angry', 'sad', 'friendly']:
             text_hint += f"[ERROR] The style {style} is not supported for English, which should be in ['default', 'whispering', 'shouting', 'excited', 'cheerful', 'terrified', 'angry', 'sad', 'friendly']\n"
@@ -113,6 +127,8 @@ def predict(prompt, style, audio_file_pth, agree):
             None,
         )
     
+    tone_color_converter = get_tone_color_converter()
+
     # note diffusion_conditioning not used on hifigan (default mode), it will be empty but need to pass it to model.inference
     try:
         target_se, audio_name = se_extractor.get_se(speaker_wav, tone_color_converter, target_dir='processed', vad=True)
@@ -128,7 +144,7 @@ def predict(prompt, style, audio_file_pth, agree):
         )
 
     src_path = f'{output_dir}/tmp.wav'
-    tts_model.tts(prompt, src_path, speaker=style, language=language)
+    tts_model.tts(prompt, src_path, speaker=style, language=language, seed=args.seed)
 
     save_path = f'{output_dir}/output.wav'
     # Run the tone color converter
@@ -138,7 +154,8 @@ def predict(prompt, style, audio_file_pth, agree):
         src_se=source_se, 
         tgt_se=target_se, 
         output_path=save_path,
-        message=encode_message)
+        message=encode_message,
+        seed=args.seed)
 
     text_hint += f'''Get response successfully \n'''
 
@@ -271,5 +288,10 @@ with gr.Blocks(analytics_enabled=False) as demo:
                         cache_examples=False,)
             tts_button.click(predict, [input_text_gr, style_gr, ref_gr, tos_gr], outputs=[out_text_gr, audio_gr, ref_audio_gr])
 
+# Pay the first-call costs before the demo accepts requests.
+if not args.skip_warmup:
+    get_base_speaker_tts(en_ckpt_base).warmup()
+    get_tone_color_converter().warmup()
+
 demo.queue()  
 demo.launch(debug=True, show_api=True, share=args.share)
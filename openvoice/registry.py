@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+def resident_bytes(obj):
+    """
+    Bytes held by the parameters and buffers of a module, of every module
+    attribute of an object (the model, watermark model, ConvSTFT of a
+    BaseSpeakerTTS / ToneColorConverter), or by a tensor.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.numel() * obj.element_size()
+    if isinstance(obj, torch.nn.Module):
+        modules = [obj]
+    else:
+        modules = [value for value in vars(obj).values() if isinstance(value, torch.nn.Module)]
+    tensors = {}
+    for module in modules:
+        for t in list(module.parameters()) + list(module.buffers()):
+            tensors[id(t)] = t
+    return sum(t.numel() * t.element_size() for t in tensors.values())
+
+
+class ModelRegistry(object):
+    """
+    Loads models and speaker embeddings on first use and keeps the most
+    recently used ones within a memory budget.
+
+    Entries are keyed by what was loaded (class, config, checkpoint, options).
+    When the resident bytes of all entries exceed max_bytes, least recently
+    used entries are dropped until they fit again; the entry just requested
+    is never dropped. A dropped model is freed once its last user lets go
+    of it. Concurrent requests for the same key load it once; other keys
+    load in parallel.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (obj, nbytes)
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0}
+
+    def get(self, key, loader):
+        """obj for key, calling loader() to build it when it is not resident."""
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self.entries[key][0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # Loaded by another thread while this one waited.
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return self.entries[key][0]
+            try:
+                obj = loader()
+                nbytes = resident_bytes(obj)
+                with self._lock:
+                    self.entries[key] = (obj, nbytes)
+                    self.total_bytes += nbytes
+                    self.stats['loads'] += 1
+                    self._evict(keep=key)
+            finally:
+                with self._lock:
+                    self._load_locks.pop(key, None)
+            return obj
+
+    def _evict(self, keep):
+        if self.max_bytes is None:
+            return
+        for key in list(self.entries.keys()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            obj, nbytes = self.entries.pop(key)
+            self.total_bytes -= nbytes
+            self.stats['evictions'] += 1
+            print(f"Evicted {key} ({nbytes / 2 ** 20:.1f} MB) from the model registry")
+
+    def evict(self, key):
+        with self._lock:
+            if key in self.entries:
+                obj, nbytes = self.entries.pop(key)
+                self.total_bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def get_model(self, cls, config_path, ckpt_path, **kwargs):
+        """
+        cls(config_path, **kwargs) with ckpt_path loaded, e.g.
+        registry.get_model(BaseSpeakerTTS, 'checkpoints/base_speakers/EN/config.json',
+                           'checkpoints/base_speakers/EN/checkpoint.pth', device='cpu')
+        """
+        key = (cls.__name__, config_path, ckpt_path, tuple(sorted(kwargs.items())))
+
+        def load():
+            model = cls(config_path, **kwargs)
+            model.load_ckpt(ckpt_path)
+            return model
+
+        return self.get(key, load)
+
+    def get_tensor(self, path, device='cpu'):
+        """A tensor saved with torch.save, such as a speaker embedding."""
+        return self.get(('tensor', path, str(device)), lambda: torch.load(path, map_location=device))
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry(max_bytes=None):
+    """The process-wide ModelRegistry; max_bytes applies when it is first created."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry(max_bytes=max_bytes)
+        return _default_registry
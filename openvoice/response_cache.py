@@ -0,0 +1,160 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+def tensor_hash(x):
+    """sha256 of a tensor or array's float32 values (speaker embeddings)."""
+    if isinstance(x, torch.Tensor):
+        x = x.detach().float().cpu().numpy()
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    return hashlib.sha256(x.tobytes()).hexdigest()
+
+
+def state_dict_hash(module):
+    """sha256 over the names and bytes of a module's parameters and buffers."""
+    h = hashlib.sha256()
+    for name, tensor in sorted(module.state_dict().items()):
+        h.update(name.encode('utf-8'))
+        h.update(tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy().tobytes())
+    return h.hexdigest()
+
+
+def response_key(**fields):
+    """Key for a response from the fields that determine it; values must be JSON serializable."""
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ResponseCache(object):
+    """
+    Finished waveforms (float32 arrays) by response_key.
+
+    Two tiers: the most recently used responses are held in memory up to
+    max_memory_bytes; with a cache_dir every response is also written to
+    cache_dir/<key[:2]>/<key>.npy, and the least recently used files are
+    deleted once they add up to more than max_disk_bytes. A disk hit is
+    promoted back into memory. Only deterministic requests (a fixed seed)
+    should be cached.
+    """
+
+    def __init__(self, cache_dir=None, max_memory_bytes=256 * 2 ** 20, max_disk_bytes=4 * 2 ** 30):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()  # key -> array
+        self.memory_bytes = 0
+        self.disk = OrderedDict()  # key -> file size, least recently used first
+        self.disk_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.npy')
+
+    def _scan(self):
+        entries = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.npy'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_bytes += size
+
+    def get(self, key):
+        """A copy of the cached waveform, or None."""
+        with self._lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self.memory[key].copy()
+            on_disk = key in self.disk
+        if on_disk:
+            try:
+                audio = np.load(self._path(key))
+                os.utime(self._path(key))
+            except OSError:
+                audio = None
+            if audio is not None:
+                with self._lock:
+                    if key in self.disk:
+                        self.disk.move_to_end(key)
+                    self.stats['disk_hits'] += 1
+                    self._remember(key, audio)
+                return audio.copy()
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key, audio):
+        audio = np.ascontiguousarray(audio, dtype=np.float32).copy()
+        if self.cache_dir is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, audio)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        with self._lock:
+            self._remember(key, audio)
+            if self.cache_dir is not None:
+                self.disk_bytes += size - self.disk.pop(key, 0)
+                self.disk[key] = size
+                self._evict_disk(keep=key)
+
+    def _remember(self, key, audio):
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key).nbytes
+        if audio.nbytes > self.max_memory_bytes:
+            return
+        self.memory[key] = audio
+        self.memory_bytes += audio.nbytes
+        while self.memory_bytes > self.max_memory_bytes:
+            _, dropped = self.memory.popitem(last=False)
+            self.memory_bytes -= dropped.nbytes
+
+    def _evict_disk(self, keep):
+        for key in list(self.disk.keys()):
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            if key == keep:
+                continue
+            self.disk_bytes -= self.disk.pop(key)
+            self.stats['evictions'] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_or_compute(self, key, compute):
+        """The cached waveform for key, or compute() stored under it."""
+        audio = self.get(key)
+        if audio is None:
+            audio = compute()
+            self.put(key, audio)
+        return audio
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+            keys = list(self.disk.keys())
+            self.disk.clear()
+            self.disk_bytes = 0
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import torch
+
+from openvoice import commons
+
+
+class LengthBucketScheduler(object):
+    """
+    Micro-batches token sequences of very different lengths for SynthesizerTrn.infer.
+
+    Sequences are sorted by length and cut greedily into batches. A batch is
+    closed when adding the next sequence would exceed max_tokens padded
+    tokens (batch size x longest sequence), max_batch_size items, or a
+    padding waste (padded tokens that carry no text) above max_padding_ratio.
+    A single sequence always forms a batch, however long it is.
+
+    stats accumulates real and padded counts over every infer call, for the
+    text tokens and for the output frames the decoder runs over.
+
+    With num_workers > 1 the batches run concurrently on a thread pool
+    (commons.parallel_map); outputs are still returned in input order.
+    """
+
+    def __init__(self, max_tokens=2048, max_batch_size=16, max_padding_ratio=0.2, num_workers=1):
+        assert max_tokens > 0 and max_batch_size > 0
+        assert 0. <= max_padding_ratio < 1.
+        self.max_tokens = max_tokens
+        self.max_batch_size = max_batch_size
+        self.max_padding_ratio = max_padding_ratio
+        self.num_workers = num_workers
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'items': 0,
+            'batches': 0,
+            'tokens': 0,
+            'padded_tokens': 0,
+            'frames': 0,
+            'padded_frames': 0,
+        }
+
+    def padding_efficiency(self):
+        """Fraction of the computed tokens and frames that were not padding."""
+        stats = self.stats
+        return {
+            'tokens': stats['tokens'] / max(stats['padded_tokens'], 1),
+            'frames': stats['frames'] / max(stats['padded_frames'], 1),
+        }
+
+    def plan(self, lengths):
+        """Batches as lists of indices into lengths, longest sequences first."""
+        order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+        batches = []
+        batch, total = [], 0
+        for i in order:
+            if batch:
+                longest = lengths[batch[0]]
+                n = len(batch) + 1
+                padded = n * longest
+                if (n > self.max_batch_size or padded > self.max_tokens
+                        or 1. - (total + lengths[i]) / padded > self.max_padding_ratio):
+                    batches.append(batch)
+                    batch, total = [], 0
+            batch.append(i)
+            total += lengths[i]
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def select(value, index, n):
+        """Rows of a per-item argument (a list, or a tensor with n rows) for one batch."""
+        if isinstance(value, (list, tuple)):
+            return [value[i] for i in index]
+        if isinstance(value, torch.Tensor) and value.dim() > 0 and value.size(0) == n:
+            return value[torch.as_tensor(index, device=value.device)]
+        return value
+
+    def infer(self, model, sequences, device, seed=None, **kwargs):
+        """
+        sequences: 1-D LongTensors of token ids, as returned by get_text
+        seed: makes the noise reproducible. Batch k draws from its own
+            generator seeded with seed + k, so the result does not depend on
+            the order the workers run the batches in.
+        kwargs: passed to model.infer; a list or a tensor with one row per
+            sequence (e.g. sid) is split along with the batches
+        returns one float32 waveform per sequence, in input order
+        """
+        n = len(sequences)
+        lengths = [int(s.size(0)) for s in sequences]
+        hop = int(np.prod(model.dec.upsample_rates))
+        batches = self.plan(lengths)
+        if self.num_workers > 1 and len(batches) < self.num_workers:
+            # Too few batches to occupy the workers: split into one per item.
+            batches = [[i] for index in batches for i in index]
+
+        def run(task):
+            k, index = task
+            batch_lengths = [lengths[i] for i in index]
+            x = torch.zeros(len(index), max(batch_lengths), dtype=torch.long)
+            for j, i in enumerate(index):
+                x[j, :lengths[i]] = sequences[i]
+            x = x.to(device)
+            x_lengths = torch.LongTensor(batch_lengths).to(device)
+            batch_kwargs = {name: self.select(value, index, n) for name, value in kwargs.items()}
+            generator = commons.make_generator(None if seed is None else seed + k)
+            o, _, y_mask, _ = model.infer(x, x_lengths, generator=generator, **batch_kwargs)
+            y_lengths = y_mask.sum([1, 2]).long().tolist()
+            outputs = [o[j, 0, :y_lengths[j] * hop].data.cpu().float().numpy() for j in range(len(index))]
+            return outputs, batch_lengths, y_lengths, y_mask.size(-1)
+
+        audios = [None] * n
+        results = commons.parallel_map(run, enumerate(batches), self.num_workers)
+        # One scheduler may serve several request threads at once.
+        with self._stats_lock:
+            self.record(batches, results)
+        for index, (outputs, _, _, _) in zip(batches, results):
+            for i, audio in zip(index, outputs):
+                audios[i] = audio
+        return audios
+
+    def record(self, batches, results):
+        stats = self.stats
+        for index, (_, batch_lengths, y_lengths, max_frames) in zip(batches, results):
+            stats['items'] += len(index)
+            stats['batches'] += 1
+            stats['tokens'] += sum(batch_lengths)
+            stats['padded_tokens'] += len(index) * max(batch_lengths)
+            stats['frames'] += sum(y_lengths)
+            stats['padded_frames'] += len(index) * max_frames
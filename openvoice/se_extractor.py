@@ -1,25 +1,36 @@
 import os
 import glob
+import threading
 import torch
-import hashlib
-import librosa
-import base64
 from glob import glob
 import numpy as np
-from pydub import AudioSegment
-from faster_whisper import WhisperModel
-import hashlib
-import base64
-import librosa
-from whisper_timestamped.transcribe import get_audio_tensor, get_vad_segments
+from openvoice.audio import load_audio, as_decoded_audio, save_audio
+from openvoice.vad import energy_vad
 
 model_size = "medium"
-# Run on GPU with FP16
+# Run on GPU with FP16 when available
 model = None
-def split_audio_whisper(audio_path, audio_name, target_dir='processed'):
+_model_lock = threading.Lock()
+
+
+def get_whisper_model():
+    """The shared WhisperModel, loaded by the first caller only."""
     global model
     if model is None:
-        model = WhisperModel(model_size, device="cuda", compute_type="float16")
+        with _model_lock:
+            if model is None:
+                from faster_whisper import WhisperModel
+                if torch.cuda.is_available():
+                    model = WhisperModel(model_size, device="cuda", compute_type="float16")
+                else:
+                    model = WhisperModel(model_size, device="cpu", compute_type="int8")
+    return model
+
+
+def split_audio_whisper(audio_path, audio_name, target_dir='processed'):
+    from pydub import AudioSegment
+
+    model = get_whisper_model()
     audio = AudioSegment.from_file(audio_path)
     max_len = len(audio)
 
@@ -74,26 +85,56 @@ def split_audio_whisper(audio_path, audio_name, target_dir='processed'):
     return wavs_folder
 
 
-def split_audio_vad(audio_path, audio_name, target_dir, split_seconds=10.0):
+def energy_segments(audio, min_speech_duration=0.1, min_silence_duration=1.0):
+    """Default segmenter: frame energy / zero-crossing VAD on the native-rate buffer."""
+    return [
+        (start / audio.sample_rate, end / audio.sample_rate)
+        for start, end in energy_vad(
+            audio.mono,
+            audio.sample_rate,
+            min_speech_duration=min_speech_duration,
+            min_silence_duration=min_silence_duration,
+        )
+    ]
+
+
+def silero_segments(audio, min_speech_duration=0.1, min_silence_duration=1.0):
+    """Opt-in segmenter: silero VAD through whisper_timestamped (loads a torch hub model)."""
+    from whisper_timestamped.transcribe import get_vad_segments
+
     SAMPLE_RATE = 16000
-    audio_vad = get_audio_tensor(audio_path)
+    audio_vad = torch.from_numpy(audio.resample(SAMPLE_RATE))
     segments = get_vad_segments(
         audio_vad,
         output_sample=True,
-        min_speech_duration=0.1,
-        min_silence_duration=1,
+        min_speech_duration=min_speech_duration,
+        min_silence_duration=min_silence_duration,
         method="silero",
     )
-    segments = [(seg["start"], seg["end"]) for seg in segments]
-    segments = [(float(s) / SAMPLE_RATE, float(e) / SAMPLE_RATE) for s,e in segments]
+    return [(float(seg["start"]) / SAMPLE_RATE, float(seg["end"]) / SAMPLE_RATE) for seg in segments]
+
+
+# segmenter(audio: DecodedAudio, min_speech_duration, min_silence_duration) -> [(start_sec, end_sec)]
+segmenters = {
+    'energy': energy_segments,
+    'silero': silero_segments,
+}
+
+
+def register_segmenter(name, segmenter):
+    segmenters[name] = segmenter
+
+
+def split_audio_vad(audio_path, audio_name, target_dir, split_seconds=10.0, segmenter='energy'):
+    audio = as_decoded_audio(audio_path)
+    segments = segmenters[segmenter](audio, min_speech_duration=0.1, min_silence_duration=1)
     print(segments)
-    audio_active = AudioSegment.silent(duration=0)
-    audio = AudioSegment.from_file(audio_path)
 
-    for start_time, end_time in segments:
-        audio_active += audio[int( start_time * 1000) : int(end_time * 1000)]
-    
-    audio_dur = audio_active.duration_seconds
+    sr = audio.sample_rate
+    spans = [audio.data[:, int(start_time * sr): int(end_time * sr)] for start_time, end_time in segments]
+    audio_active = np.concatenate(spans, axis=1) if spans else audio.data[:, :0]
+
+    audio_dur = audio_active.shape[1] / sr
     print(f'after vad: dur = {audio_dur}')
     target_folder = os.path.join(target_dir, audio_name)
     wavs_folder = os.path.join(target_folder, 'wavs')
@@ -109,29 +150,22 @@ def split_audio_vad(audio_path, audio_name, target_dir, split_seconds=10.0):
         if i == num_splits - 1:
             end_time = audio_dur
         output_file = f"{wavs_folder}/{audio_name}_seg{count}.wav"
-        audio_seg = audio_active[int(start_time * 1000): int(end_time * 1000)]
-        audio_seg.export(output_file, format='wav')
+        audio_seg = audio_active[:, int(start_time * sr): int(end_time * sr)]
+        save_audio(output_file, audio_seg.T, sr)
         start_time = end_time
         count += 1
     return wavs_folder
 
 def hash_numpy_array(audio_path):
-    array, _ = librosa.load(audio_path, sr=None, mono=True)
-    # Convert the array to bytes
-    array_bytes = array.tobytes()
-    # Calculate the hash of the array bytes
-    hash_object = hashlib.sha256(array_bytes)
-    hash_value = hash_object.digest()
-    # Convert the hash value to base64
-    base64_value = base64.b64encode(hash_value)
-    return base64_value.decode('utf-8')[:16].replace('/', '_^')
-
-def get_se(audio_path, vc_model, target_dir='processed', vad=True):
+    return as_decoded_audio(audio_path).content_hash
+
+def get_se(audio_path, vc_model, target_dir='processed', vad=True, segmenter='energy'):
     device = vc_model.device
     version = vc_model.version
     print("OpenVoice version:", version)
 
-    audio_name = f"{os.path.basename(audio_path).rsplit('.', 1)[0]}_{version}_{hash_numpy_array(audio_path)}"
+    audio = load_audio(audio_path)
+    audio_name = f"{os.path.basename(audio_path).rsplit('.', 1)[0]}_{version}_{audio.content_hash}"
     se_path = os.path.join(target_dir, audio_name, 'se.pth')
 
     # if os.path.isfile(se_path):
@@ -141,7 +175,7 @@ def get_se(audio_path, vc_model, target_dir='processed', vad=True):
     #     wavs_folder = audio_path
     
     if vad:
-        wavs_folder = split_audio_vad(audio_path, target_dir=target_dir, audio_name=audio_name)
+        wavs_folder = split_audio_vad(audio, target_dir=target_dir, audio_name=audio_name, segmenter=segmenter)
     else:
         wavs_folder = split_audio_whisper(audio_path, target_dir=target_dir, audio_name=audio_name)
     
@@ -0,0 +1,234 @@
+import os
+import json
+import threading
+
+import numpy as np
+import torch
+
+
+def _as_matrix(embeddings, dim):
+    if isinstance(embeddings, torch.Tensor):
+        embeddings = embeddings.detach().float().cpu().numpy()
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings.reshape(-1, dim)
+
+
+class SpeakerEmbeddingLibrary(object):
+    """
+    Speaker embeddings (tone color vectors) stored as one memory-mapped matrix.
+
+    Layout of the library directory:
+        meta.json       {"dim": gin_channels, "dtype": "float16" | "float32"}
+        embeddings.bin  row-major [n, dim] matrix, append-only
+        ids.txt         one id per row, append-only
+        deleted.txt     rows removed since the last compaction
+
+    Opening a library only maps the matrix, so load cost does not grow with the
+    number of voices. Rows are appended in place; removed rows are skipped
+    until compact() rewrites the files.
+    """
+
+    def __init__(self, root, dim=None, dtype='float32'):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        meta_path = os.path.join(root, 'meta.json')
+        if os.path.isfile(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            assert dim is None or dim == meta['dim'], f"library dim is {meta['dim']}, not {dim}"
+        else:
+            assert dim is not None, "dim is required to create a new library"
+            assert dtype in ('float16', 'float32'), f"dtype {dtype} is not supported"
+            meta = {'dim': dim, 'dtype': dtype}
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+        self.dim = meta['dim']
+        self.dtype = np.dtype(meta['dtype'])
+        self._lock = threading.Lock()
+        self._open()
+
+    @property
+    def _matrix_path(self):
+        return os.path.join(self.root, 'embeddings.bin')
+
+    @property
+    def _ids_path(self):
+        return os.path.join(self.root, 'ids.txt')
+
+    @property
+    def _deleted_path(self):
+        return os.path.join(self.root, 'deleted.txt')
+
+    @staticmethod
+    def _read_lines(path):
+        if not os.path.isfile(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def _open(self):
+        row_bytes = self.dim * self.dtype.itemsize
+        matrix_bytes = os.path.getsize(self._matrix_path) if os.path.isfile(self._matrix_path) else 0
+        ids_data = b''
+        if os.path.isfile(self._ids_path):
+            with open(self._ids_path, 'rb') as f:
+                ids_data = f.read()
+        # Only lines with their newline are complete.
+        lines = ids_data.split(b'\n')[:-1]
+        n_rows = min(matrix_bytes // row_bytes, len(lines))
+        # A crash during or between the two appends of add() leaves surplus or
+        # partial rows or ids. Cut them off, so the next add() lines up again.
+        if matrix_bytes > n_rows * row_bytes:
+            os.truncate(self._matrix_path, n_rows * row_bytes)
+        ids_bytes = sum(len(line) + 1 for line in lines[:n_rows])
+        if len(ids_data) > ids_bytes:
+            os.truncate(self._ids_path, ids_bytes)
+        self.row_ids = [line.decode('utf-8').rstrip('\r') for line in lines[:n_rows]]
+        if n_rows > 0:
+            self.matrix = np.memmap(self._matrix_path, dtype=self.dtype, mode='r', shape=(n_rows, self.dim))
+        else:
+            self.matrix = np.zeros((0, self.dim), dtype=self.dtype)
+
+        self.index = {}
+        for row, speaker_id in enumerate(self.row_ids):
+            self.index[speaker_id] = row
+        deleted = set(int(row) for row in self._read_lines(self._deleted_path))
+        for speaker_id, row in list(self.index.items()):
+            if row in deleted:
+                del self.index[speaker_id]
+        self.live = np.zeros(n_rows, dtype=bool)
+        self.live[list(self.index.values())] = True
+        self._norms = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, speaker_id):
+        return speaker_id in self.index
+
+    @property
+    def ids(self):
+        return list(self.index.keys())
+
+    def norms(self, chunk_size=65536):
+        if self._norms is None or len(self._norms) != len(self.matrix):
+            start = 0 if self._norms is None else len(self._norms)
+            parts = [] if self._norms is None else [self._norms]
+            for i in range(start, len(self.matrix), chunk_size):
+                chunk = np.asarray(self.matrix[i:i + chunk_size], dtype=np.float32)
+                parts.append(np.linalg.norm(chunk, axis=1))
+            self._norms = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        return self._norms
+
+    def add(self, ids, embeddings, dedupe_threshold=None):
+        """
+        Append embeddings under ids. Re-using an id replaces its embedding.
+        With dedupe_threshold, an embedding whose cosine similarity to a stored
+        voice reaches the threshold is not stored; the existing id is returned
+        in its place. Returns the id each embedding resolved to.
+        """
+        if isinstance(ids, str):
+            ids = [ids]
+        embeddings = _as_matrix(embeddings, self.dim)
+        assert len(ids) == len(embeddings), "ids and embeddings differ in length"
+        assert all('\n' not in speaker_id for speaker_id in ids), "ids must not contain newlines"
+
+        with self._lock:
+            resolved = list(ids)
+            keep = np.ones(len(ids), dtype=bool)
+            if dedupe_threshold is not None and len(self.index) > 0:
+                for i, matches in enumerate(self._search(embeddings, k=1)):
+                    if matches and matches[0][1] >= dedupe_threshold:
+                        resolved[i] = matches[0][0]
+                        keep[i] = False
+            if not keep.any():
+                return resolved
+
+            new_ids = [speaker_id for speaker_id, k in zip(ids, keep) if k]
+            with open(self._matrix_path, 'ab') as f:
+                f.write(np.ascontiguousarray(embeddings[keep], dtype=self.dtype).tobytes())
+            with open(self._ids_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(speaker_id + '\n' for speaker_id in new_ids))
+
+            norms = self._norms
+            self._open()
+            if norms is not None:
+                self._norms = np.concatenate([norms, np.linalg.norm(embeddings[keep], axis=1)])
+            return resolved
+
+    def remove(self, ids):
+        if isinstance(ids, str):
+            ids = [ids]
+        with self._lock:
+            rows = [self.index.pop(speaker_id) for speaker_id in ids if speaker_id in self.index]
+            with open(self._deleted_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(f'{row}\n' for row in rows))
+            self.live[rows] = False
+
+    def compact(self):
+        """Rewrite the files without removed or replaced rows."""
+        with self._lock:
+            rows = np.flatnonzero(self.live)
+            tmp_matrix = self._matrix_path + '.tmp'
+            with open(tmp_matrix, 'wb') as f:
+                for i in range(0, len(rows), 65536):
+                    f.write(np.ascontiguousarray(self.matrix[rows[i:i + 65536]]).tobytes())
+            tmp_ids = self._ids_path + '.tmp'
+            with open(tmp_ids, 'w', encoding='utf-8') as f:
+                f.write(''.join(self.row_ids[row] + '\n' for row in rows))
+            self.matrix = None
+            os.replace(tmp_matrix, self._matrix_path)
+            os.replace(tmp_ids, self._ids_path)
+            if os.path.isfile(self._deleted_path):
+                os.remove(self._deleted_path)
+            self._open()
+
+    def get(self, ids, device='cpu'):
+        """Embeddings for ids as a float32 tensor of shape [n, dim, 1], the layout of se.pth."""
+        if isinstance(ids, str):
+            ids = [ids]
+        rows = [self.index[speaker_id] for speaker_id in ids]
+        se = np.asarray(self.matrix[rows], dtype=np.float32)
+        return torch.from_numpy(se).unsqueeze(-1).to(device)
+
+    def search(self, queries, k=5):
+        """
+        Cosine top-k over all stored voices. queries may be ref_enc outputs
+        [n, dim] or embeddings [n, dim, 1]. Returns, per query, a list of
+        (id, similarity) sorted by decreasing similarity.
+        """
+        return self._search(_as_matrix(queries, self.dim), k)
+
+    def _search(self, queries, k, chunk_size=65536):
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-8)
+        norms = self.norms()
+        n_rows = len(self.matrix)
+        k = min(k, len(self.index))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, n_rows, chunk_size):
+            chunk = np.asarray(self.matrix[start:start + chunk_size], dtype=np.float32)
+            scores = queries @ chunk.T / np.maximum(norms[start:start + len(chunk)], 1e-8)
+            scores[:, ~self.live[start:start + len(chunk)]] = -np.inf
+            rows = np.broadcast_to(np.arange(start, start + len(chunk)), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(self.row_ids[row], float(score)) for row, score in zip(rows, scores) if np.isfinite(score)]
+            for rows, scores in zip(best_rows.tolist(), best_scores.tolist())
+        ]
+
+    def import_se(self, speaker_id, se_path, dedupe_threshold=None):
+        """Add an embedding saved with torch.save (en_default_se.pth, processed/<name>/se.pth, ...)."""
+        se = torch.load(se_path, map_location='cpu')
+        return self.add([speaker_id], se, dedupe_threshold=dedupe_threshold)[0]
@@ -1,16 +1,46 @@
 import re
-from openvoice.text.english import english_to_lazy_ipa, english_to_ipa2, english_to_lazy_ipa2
-from openvoice.text.mandarin import number_to_chinese, chinese_to_bopomofo, latin_to_bopomofo, chinese_to_romaji, chinese_to_lazy_ipa, chinese_to_ipa, chinese_to_ipa2
+import importlib
+import threading
+
+# Language mark -> converter from a text span to IPA, given as a callable or as
+# "module:function". Modules are imported the first time their language shows
+# up, so an English-only service never loads jieba, pypinyin or cn2an.
+language_converters = {
+    'ZH': 'openvoice.text.mandarin:chinese_to_ipa',
+    'EN': 'openvoice.text.english:english_to_ipa2',
+}
+_converters_lock = threading.Lock()
+
+
+def register_language(mark, converter):
+    """converter: a callable, or "module:function" to import on first use."""
+    with _converters_lock:
+        language_converters[mark] = converter
+
+
+def get_language_converter(mark):
+    with _converters_lock:
+        converter = language_converters.get(mark)
+        if converter is None:
+            raise Exception('No text converter registered for language: %s' % mark)
+        if isinstance(converter, str):
+            module_name, function_name = converter.split(':')
+            converter = getattr(importlib.import_module(module_name), function_name)
+            language_converters[mark] = converter
+        return converter
+
+
+# Marks cjke_cleaners2 applies first, in this order; other registered marks follow.
+cjke_marks = ('ZH', 'JA', 'KO', 'EN')
+
 
 def cjke_cleaners2(text):
-    text = re.sub(r'\[ZH\](.*?)\[ZH\]',
-                  lambda x: chinese_to_ipa(x.group(1))+' ', text)
-    text = re.sub(r'\[JA\](.*?)\[JA\]',
-                  lambda x: japanese_to_ipa2(x.group(1))+' ', text)
-    text = re.sub(r'\[KO\](.*?)\[KO\]',
-                  lambda x: korean_to_ipa(x.group(1))+' ', text)
-    text = re.sub(r'\[EN\](.*?)\[EN\]',
-                  lambda x: english_to_ipa2(x.group(1))+' ', text)
+    with _converters_lock:
+        marks = cjke_marks + tuple(mark for mark in language_converters if mark not in cjke_marks)
+    for mark in marks:
+        if '[%s]' % mark in text:
+            text = re.sub(r'\[%s\](.*?)\[%s\]' % (mark, mark),
+                          lambda x: get_language_converter(mark)(x.group(1))+' ', text)
     text = re.sub(r'\s+$', '', text)
     text = re.sub(r'([^\.,!\?\-…~])$', r'\1.', text)
     return text
\ No newline at end of file
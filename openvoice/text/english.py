@@ -17,10 +17,20 @@ hyperparameter. Some cleaners are English-specific. You'll typically want to use
 
 
 import re
+import threading
 import inflect
 from unidecode import unidecode
 import eng_to_ipa as ipa
 _inflect = inflect.engine()
+# number_to_words keeps its options on the engine between calls.
+_inflect_lock = threading.Lock()
+
+
+def _number_to_words(*args, **kwargs):
+    with _inflect_lock:
+        return _inflect.number_to_words(*args, **kwargs)
+
+
 _comma_number_re = re.compile(r'([0-9][0-9\,]+[0-9])')
 _decimal_number_re = re.compile(r'([0-9]+\.[0-9]+)')
 _pounds_re = re.compile(r'£([0-9\,]*[0-9]+)')
@@ -125,7 +135,7 @@ def _expand_dollars(m):
 
 
 def _expand_ordinal(m):
-    return _inflect.number_to_words(m.group(0))
+    return _number_to_words(m.group(0))
 
 
 def _expand_number(m):
@@ -134,13 +144,13 @@ def _expand_number(m):
         if num == 2000:
             return 'two thousand'
         elif num > 2000 and num < 2010:
-            return 'two thousand ' + _inflect.number_to_words(num % 100)
+            return 'two thousand ' + _number_to_words(num % 100)
         elif num % 100 == 0:
-            return _inflect.number_to_words(num // 100) + ' hundred'
+            return _number_to_words(num // 100) + ' hundred'
         else:
-            return _inflect.number_to_words(num, andword='', zero='oh', group=2).replace(', ', ' ')
+            return _number_to_words(num, andword='', zero='oh', group=2).replace(', ', ' ')
     else:
-        return _inflect.number_to_words(num, andword='')
+        return _number_to_words(num, andword='')
 
 
 def normalize_numbers(text):
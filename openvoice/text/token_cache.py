@@ -0,0 +1,120 @@
+import json
+import sqlite3
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=16)
+def _symbols_hash(symbols):
+    return hashlib.sha256('\x00'.join(symbols).encode('utf-8')).hexdigest()
+
+
+def token_key(text, symbols, cleaner_names, add_blank):
+    """
+    Key of the token ids of text: the text (language marks included), the
+    cleaners it goes through, a hash of the symbol table and add_blank.
+    """
+    fields = [text, list(cleaner_names), _symbols_hash(tuple(symbols)), bool(add_blank)]
+    return hashlib.sha256(json.dumps(fields).encode('utf-8')).hexdigest()
+
+
+class TokenCache(object):
+    """
+    Token id sequences of already-seen sentences, so repeats skip the
+    cleaners (phonemizer, jieba, pypinyin) and the symbol lookup.
+
+    The max_entries most recently used sequences are held in memory. With a
+    path, every sequence is also stored in an sqlite database there and
+    survives restarts; a miss in memory is looked up in the database before
+    anything is computed.
+    """
+
+    def __init__(self, max_entries=10000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()  # key -> tuple of ids
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'persistent_hits': 0, 'misses': 0}
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, ids BLOB)')
+            self._db.commit()
+
+    def get(self, key):
+        """The cached ids (a tuple) for key, or None."""
+        with self._lock:
+            ids = self.entries.get(key)
+            if ids is not None:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return ids
+            if self._db is not None:
+                row = self._db.execute('SELECT ids FROM tokens WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    ids = tuple(np.frombuffer(row[0], dtype='<i4').tolist())
+                    self._remember(key, ids)
+                    self.stats['persistent_hits'] += 1
+                    return ids
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, ids):
+        ids = tuple(int(i) for i in ids)
+        with self._lock:
+            self._remember(key, ids)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO tokens (key, ids) VALUES (?, ?)',
+                                 (key, np.asarray(ids, dtype='<i4').tobytes()))
+                self._db.commit()
+        return ids
+
+    def _remember(self, key, ids):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = ids
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Cached ids for key, or compute() (a list of ids) stored under it."""
+        ids = self.get(key)
+        if ids is None:
+            ids = self.put(key, compute())
+        return ids
+
+    def hit_rate(self):
+        stats = self.stats
+        hits = stats['hits'] + stats['persistent_hits']
+        return hits / max(hits + stats['misses'], 1)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM tokens')
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_token_cache(max_entries=10000, path=None):
+    """The process-wide TokenCache used by get_text; the arguments apply when it is first created."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TokenCache(max_entries=max_entries, path=path)
+        return _default_cache
@@ -55,36 +55,109 @@ class HParams:
         return self.__dict__.__repr__()
 
 
+class IncrementalSentenceSplitter(object):
+    """
+    split_sentence for text that arrives in fragments, such as tokens from a
+    language model.
+
+    feed(fragment) returns the sentences that became final with it and
+    finish() the rest, once the text is complete. The sentences put out are
+    exactly those split_sentence(whole_text, min_len, language_str) returns
+    (as long as the text does not contain the literal "$#!" that splitter
+    uses internally). A sentence is final once the text after it is known
+    to start another sentence of more than two words (characters for
+    Chinese), so merge_short_sentences can no longer join the two; that is
+    usually a few words into the next sentence.
+    """
+
+    # Marks split_sentence cuts after, before the full-width ones are mapped.
+    punctuation = set(',.!?;。！？；，')
+
+    def __init__(self, min_len=10, language_str='EN'):
+        self.min_len = min_len
+        if language_str in ['EN']:
+            self.pieces = sentence_pieces_latin
+            self.measure = lambda s: len(s.split(" "))
+        else:
+            self.pieces = sentence_pieces_zh
+            self.measure = len
+        self.buffer = ''  # text after the last punctuation mark
+        self.group = []  # pieces of the group being filled
+        self.count_len = 0
+        self.pending = []  # grouped sentences that may still be merged
+
+    def _add_piece(self, piece):
+        self.group.append(piece)
+        self.count_len += self.measure(piece)
+        if self.count_len > self.min_len:
+            self._close_group()
+
+    def _close_group(self):
+        sentence = ' '.join(self.group)
+        self.group = []
+        self.count_len = 0
+        if self.pending and self.measure(self.pending[-1]) <= 2:
+            self.pending[-1] = self.pending[-1] + " " + sentence
+        else:
+            self.pending.append(sentence)
+
+    def _ready(self):
+        out = []
+        while self.pending and self.measure(self.pending[0]) > 2:
+            if len(self.pending) > 1:
+                following = self.pending[1]
+            else:
+                # Text after the last mark only ever grows into the next group.
+                following = ' '.join(self.group + self.pieces(self.buffer))
+            if self.measure(following) <= 2:
+                break
+            out.append(self.pending.pop(0))
+        return out
+
+    def feed(self, fragment):
+        self.buffer += fragment
+        end = max((i for i in range(len(self.buffer) - len(fragment), len(self.buffer))
+                   if self.buffer[i] in self.punctuation), default=-1)
+        if end >= 0:
+            text, self.buffer = self.buffer[:end + 1], self.buffer[end + 1:]
+            for piece in self.pieces(text):
+                self._add_piece(piece)
+        return self._ready()
+
+    def finish(self):
+        for piece in self.pieces(self.buffer) if self.buffer else []:
+            self.group.append(piece)
+        self.buffer = ''
+        if self.group:
+            self._close_group()
+        if len(self.pending) > 1 and self.measure(self.pending[-1]) <= 2:
+            last = self.pending.pop(-1)
+            self.pending[-1] = self.pending[-1] + " " + last
+        out, self.pending = self.pending, []
+        return out
+
+    def split(self, fragments):
+        """Yield the sentences of an iterable of text fragments as they become final."""
+        for fragment in fragments:
+            for sentence in self.feed(fragment):
+                yield sentence
+        for sentence in self.finish():
+            yield sentence
+
+
 def string_to_bits(string, pad_len=8):
-    # Convert each character to its ASCII value
-    ascii_values = [ord(char) for char in string]
-    
-    # Convert ASCII values to binary representation
-    binary_values = [bin(value)[2:].zfill(8) for value in ascii_values]
-    
-    # Convert binary strings to integer arrays
-    bit_arrays = [[int(bit) for bit in binary] for binary in binary_values]
-    
-    # Convert list of arrays to NumPy array
-    numpy_array = np.array(bit_arrays)
-    numpy_array_full = np.zeros((pad_len, 8), dtype=numpy_array.dtype)
-    numpy_array_full[:, 2] = 1
-    max_len = min(pad_len, len(numpy_array))
-    numpy_array_full[:max_len] = numpy_array[:max_len]
-    return numpy_array_full
+    # One byte per character; rows past the end of the string are padded with
+    # 0b00100000 (a space), as the watermark decoder expects.
+    codes = np.full(pad_len, 0b00100000, dtype=np.uint8)
+    values = np.frombuffer(string[:pad_len].encode('latin-1', errors='replace'), dtype=np.uint8)
+    codes[:len(values)] = values
+    # [pad_len, 8] array of bits, most significant bit first
+    return np.unpackbits(codes[:, None], axis=1)
 
 
 def bits_to_string(bits_array):
-    # Convert each row of the array to a binary string
-    binary_values = [''.join(str(bit) for bit in row) for row in bits_array]
-    
-    # Convert binary strings to ASCII values
-    ascii_values = [int(binary, 2) for binary in binary_values]
-    
-    # Convert ASCII values to characters
-    output_string = ''.join(chr(value) for value in ascii_values)
-    
-    return output_string
+    bits_array = np.asarray(bits_array, dtype=np.uint8).reshape(-1, 8)
+    return np.packbits(bits_array, axis=1).tobytes().decode('latin-1')
 
 
 def split_sentence(text, min_len=10, language_str='[EN]'):
@@ -94,15 +167,8 @@ def split_sentence(text, min_len=10, language_str='[EN]'):
         sentences = split_sentences_zh(text, min_len=min_len)
     return sentences
 
-def split_sentences_latin(text, min_len=10):
-    """Split Long sentences into list of short ones
-
-    Args:
-        str: Input sentences.
-
-    Returns:
-        List[str]: list of output sentences.
-    """
+def sentence_pieces_latin(text):
+    """Normalized text cut after every punctuation mark, before min_len grouping."""
     # deal with dirty sentences
     text = re.sub('[。！？；]', '.', text)
     text = re.sub('[，]', ',', text)
@@ -114,6 +180,19 @@ def split_sentences_latin(text, min_len=10):
     # split
     sentences = [s.strip() for s in text.split('$#!')]
     if len(sentences[-1]) == 0: del sentences[-1]
+    return sentences
+
+
+def split_sentences_latin(text, min_len=10):
+    """Split Long sentences into list of short ones
+
+    Args:
+        str: Input sentences.
+
+    Returns:
+        List[str]: list of output sentences.
+    """
+    sentences = sentence_pieces_latin(text)
 
     new_sentences = []
     new_sent = []
@@ -154,7 +233,7 @@ def merge_short_sentences_latin(sens):
         pass
     return sens_out
 
-def split_sentences_zh(text, min_len=10):
+def sentence_pieces_zh(text):
     text = re.sub('[。！？；]', '.', text)
     text = re.sub('[，]', ',', text)
     # 将文本中的换行符、空格和制表符替换为空格
@@ -165,6 +244,11 @@ def split_sentences_zh(text, min_len=10):
     # sentences = [s.strip() for s in re.split('(。|！|？|；)', text)]
     sentences = [s.strip() for s in text.split('$#!')]
     if len(sentences[-1]) == 0: del sentences[-1]
+    return sentences
+
+
+def split_sentences_zh(text, min_len=10):
+    sentences = sentence_pieces_zh(text)
 
     new_sentences = []
     new_sent = []
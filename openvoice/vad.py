@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def frame_signal(y, frame_length, hop_length):
+    """[n_frames, frame_length] strided view of a 1-D signal (no copy)."""
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame_length)
+    return frames[::hop_length]
+
+
+def frames_to_segments(flags, hop_length, frame_length, n_samples,
+                       min_speech_duration=0.1, min_silence_duration=1.0,
+                       speech_pad=0.03, sample_rate=16000):
+    """
+    Turn per-frame speech flags into [(start_sample, end_sample), ...].
+
+    Same semantics as silero's get_speech_timestamps: pauses shorter than
+    min_silence_duration do not split a segment, segments shorter than
+    min_speech_duration are dropped, and each segment is padded by speech_pad.
+    """
+    flags = np.concatenate([[0], np.asarray(flags, dtype=np.int8), [0]])
+    edges = np.diff(flags)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return []
+
+    min_silence_frames = int(round(min_silence_duration * sample_rate / hop_length))
+    keep = (starts[1:] - ends[:-1]) >= min_silence_frames
+    starts = np.concatenate([starts[:1], starts[1:][keep]])
+    ends = np.concatenate([ends[:-1][keep], ends[-1:]])
+
+    start_samples = starts * hop_length
+    end_samples = np.minimum((ends - 1) * hop_length + frame_length, n_samples)
+    min_speech_samples = int(min_speech_duration * sample_rate)
+    keep = (end_samples - start_samples) >= min_speech_samples
+    start_samples, end_samples = start_samples[keep], end_samples[keep]
+
+    pad = int(speech_pad * sample_rate)
+    start_samples = np.maximum(start_samples - pad, 0)
+    end_samples = np.minimum(end_samples + pad, n_samples)
+    return list(zip(start_samples.tolist(), end_samples.tolist()))
+
+
+def speech_flags(energy_db, zcr=None, energy_ratio=0.3, min_energy_db=-60.,
+                 zcr_threshold=0.25, unvoiced_margin_db=10.):
+    """
+    Per-frame speech flags from log energy and, optionally, zero-crossing rate.
+
+    The energy threshold sits energy_ratio of the way from the noise floor
+    (10th percentile) to the peak level (99th percentile). Frames up to
+    unvoiced_margin_db below it still count when their zero-crossing rate is
+    high, which keeps unvoiced consonants attached to the words around them.
+    """
+    noise_floor, peak = np.percentile(energy_db, [10, 99])
+    threshold = max(noise_floor + energy_ratio * (peak - noise_floor), min_energy_db)
+    flags = energy_db > threshold
+    if zcr is not None:
+        flags |= (energy_db > threshold - unvoiced_margin_db) & (zcr > zcr_threshold)
+    return flags
+
+
+def speech_frames(y, frame_length, hop_length, **kwargs):
+    frames = frame_signal(np.asarray(y, dtype=np.float32), frame_length, hop_length)
+    energy_db = 10. * np.log10(np.einsum('ij,ij->i', frames, frames) / frame_length + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+    return speech_flags(energy_db, zcr, **kwargs)
+
+
+def energy_vad(y, sample_rate, min_speech_duration=0.1, min_silence_duration=1.0,
+               frame_duration=0.03, hop_duration=0.01, speech_pad=0.03, **kwargs):
+    """Speech regions of a mono waveform as [(start_sample, end_sample), ...]."""
+    frame_length = int(frame_duration * sample_rate)
+    hop_length = int(hop_duration * sample_rate)
+    flags = speech_frames(y, frame_length, hop_length, **kwargs)
+    return frames_to_segments(
+        flags, hop_length, frame_length, len(y),
+        min_speech_duration=min_speech_duration,
+        min_silence_duration=min_silence_duration,
+        speech_pad=speech_pad,
+        sample_rate=sample_rate,
+    )
@@ -0,0 +1,192 @@
+import gc
+import os
+import queue
+import pickle
+import itertools
+import threading
+import traceback
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.reduction import ForkingPickler
+
+import torch
+
+
+def freeze_model(obj):
+    """
+    Prepare a model (or a BaseSpeakerTTS / ToneColorConverter) for sharing
+    between processes: eval mode, weight norm folded into plain weights, no
+    grad, and parameters moved to shared memory.
+
+    This is one-way and done in place: the folded modules no longer have the
+    weight_g / weight_v keys of a checkpoint, so load checkpoints first;
+    load_ckpt refuses a frozen model rather than silently loading nothing.
+    """
+    if isinstance(obj, torch.nn.Module):
+        modules = [obj]
+    else:
+        modules = [value for value in vars(obj).values() if isinstance(value, torch.nn.Module)]
+        obj.frozen = True
+    for module in modules:
+        module.eval()
+        for m in module.modules():
+            if hasattr(m, 'weight_g'):
+                torch.nn.utils.remove_weight_norm(m)
+        module.requires_grad_(False)
+        module.share_memory()
+    return obj
+
+
+def memory_usage(pid=None):
+    """
+    rss, pss and private bytes of a process, from /proc/<pid>/smaps_rollup
+    (Linux). pss charges each shared page to its users in equal parts, so
+    it shows what a worker really adds.
+    """
+    pid = os.getpid() if pid is None else pid
+    fields = {'Rss': 'rss', 'Pss': 'pss', 'Private_Clean': 'private', 'Private_Dirty': 'private'}
+    usage = {'rss': 0, 'pss': 0, 'private': 0}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in fields:
+                usage[fields[key]] += int(value.split()[0]) * 1024
+    return usage
+
+
+def _worker_main(models, num_threads, tasks, results):
+    torch.set_num_threads(num_threads)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, name, method, args, kwargs = task
+        try:
+            with torch.no_grad():
+                result = getattr(models[name], method)(*args, **kwargs)
+            # Pickled here rather than in the queue's feeder thread, which
+            # would only print the error and leave the caller waiting.
+            results.put((task_id, True, bytes(ForkingPickler.dumps(result))))
+        except Exception:
+            results.put((task_id, False, traceback.format_exc()))
+
+
+class WorkerPool(object):
+    """
+    Inference workers sharing one copy of the model weights.
+
+    models: {name: model} loaded in this process. They are frozen
+    (freeze_model) before the workers start, so with the default 'fork'
+    start method the workers map the parent's weight pages copy-on-write
+    and, as nothing writes to them, never copy them. With 'spawn' the
+    weights travel as shared-memory handles instead.
+
+    submit(name, method, *args, **kwargs) runs models[name].method(...) on
+    the next free worker and returns a Future. Each worker runs
+    num_threads intra-op threads (default: the cores split evenly).
+
+    If a worker dies (killed, out of memory, a crash in native code), the
+    pool is broken, as with concurrent.futures.ProcessPoolExecutor: every
+    pending future fails with BrokenProcessPool and so does submit().
+    Liveness is checked every poll_interval seconds.
+    """
+
+    def __init__(self, models, num_workers=2, num_threads=None, start_method='fork', poll_interval=1.0):
+        self.models = {name: freeze_model(model) for name, model in models.items()}
+        if num_threads is None:
+            num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+        self.num_threads = num_threads
+
+        ctx = torch.multiprocessing.get_context(start_method)
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        # Objects the garbage collector never touches again are not
+        # dirtied (and so not copied) in the children.
+        gc.collect()
+        gc.freeze()
+        self.workers = [
+            ctx.Process(target=_worker_main, args=(self.models, num_threads, self.tasks, self.results), daemon=True)
+            for _ in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        gc.unfreeze()
+
+        self.poll_interval = poll_interval
+        self.broken = None
+        self._closing = False
+        self._futures = {}
+        self._futures_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _collect(self):
+        while True:
+            try:
+                item = self.results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if item is None:
+                break
+            task_id, ok, value = item
+            with self._futures_lock:
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                # already failed when the pool broke
+                continue
+            if not ok:
+                future.set_exception(RuntimeError(f"worker task failed:\n{value}"))
+                continue
+            try:
+                future.set_result(pickle.loads(value))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _check_workers(self):
+        if self._closing or self.broken is not None:
+            return
+        dead = [worker for worker in self.workers if not worker.is_alive()]
+        if not dead:
+            return
+        with self._futures_lock:
+            self.broken = ', '.join(f'pid {w.pid} (exit code {w.exitcode})' for w in dead)
+            futures = list(self._futures.values())
+            self._futures.clear()
+        for future in futures:
+            future.set_exception(BrokenProcessPool(f"worker died: {self.broken}"))
+
+    def submit(self, name, method, *args, **kwargs):
+        future = Future()
+        with self._futures_lock:
+            if self.broken is not None:
+                raise BrokenProcessPool(f"worker died: {self.broken}")
+            task_id = next(self._ids)
+            self._futures[task_id] = future
+        self.tasks.put((task_id, name, method, args, kwargs))
+        return future
+
+    def map(self, name, method, items):
+        """models[name].method(*item) for each argument tuple, results in order."""
+        futures = [self.submit(name, method, *item) for item in items]
+        return [future.result() for future in futures]
+
+    def memory_usage(self):
+        """memory_usage() of every worker, keyed by pid."""
+        return {worker.pid: memory_usage(worker.pid) for worker in self.workers}
+
+    def close(self):
+        self._closing = True
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.results.put(None)
+        self._collector.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from openvoice.text.symbols import symbols
+
+# Same layout as checkpoints/*/config.json, with narrow layers so random
+# weights build and run quickly on CPU.
+MODEL = {
+    "inter_channels": 32, "hidden_channels": 32, "filter_channels": 64, "n_heads": 2, "n_layers": 2,
+    "kernel_size": 3, "p_dropout": 0.1, "resblock": "1", "resblock_kernel_sizes": [3, 7, 11],
+    "resblock_dilation_sizes": [[1, 3, 5], [1, 3, 5], [1, 3, 5]], "upsample_rates": [8, 8, 2, 2],
+    "upsample_initial_channel": 32, "upsample_kernel_sizes": [16, 16, 4, 4], "n_layers_q": 3,
+    "use_spectral_norm": False, "gin_channels": 256,
+}
+DATA = {"sampling_rate": 22050, "filter_length": 1024, "hop_length": 256, "win_length": 1024}
+
+TTS_CONFIG = {
+    "data": dict(DATA, text_cleaners=["cjke_cleaners2"], add_blank=True, n_speakers=10, cleaned_text=True),
+    "model": MODEL,
+    "speakers": {"default": 1, "whispering": 2, "shouting": 3},
+    "symbols": list(symbols),
+}
+CONVERTER_CONFIG = {
+    "_version_": "v2",
+    "data": dict(DATA, n_speakers=0),
+    "model": dict(MODEL, zero_g=True),
+}
+
+
+def write_config(tmp_path_factory, name, config):
+    path = tmp_path_factory.mktemp('configs') / f'{name}.json'
+    path.write_text(json.dumps(config), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def tts_config(tmp_path_factory):
+    return write_config(tmp_path_factory, 'tts', TTS_CONFIG)
+
+
+@pytest.fixture(scope='session')
+def converter_config(tmp_path_factory):
+    return write_config(tmp_path_factory, 'converter', CONVERTER_CONFIG)
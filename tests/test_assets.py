@@ -0,0 +1,204 @@
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openvoice.assets import AssetManager, ChecksumError, url_key
+
+PAYLOAD = os.urandom(300000)
+DIGEST = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Serves server.payload at any path with ETag server.options['etag'],
+    honouring 'Range: bytes=N-' and If-Range. server.options:
+        ranges         False ignores Range headers (always 200)
+        cut_after      close the connection after this many body bytes, once
+        total_in_416   False leaves Content-Range out of 416 responses
+        etag           None sends no ETag
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        options = self.server.options
+        payload = self.server.payload
+        self.server.requests.append(self.headers.get('Range'))
+        self.server.if_ranges.append(self.headers.get('If-Range'))
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range') or '')
+        if self.headers.get('If-Range') != options['etag']:
+            match = None
+        start = int(match.group(1)) if match and options['ranges'] else 0
+        if start >= len(payload) and match:
+            self.send_response(416)
+            if options['total_in_416']:
+                self.send_header('Content-Range', f'bytes */{len(payload)}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = payload[start:]
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header('Content-Range', f'bytes {start}-{len(payload) - 1}/{len(payload)}')
+        if options['etag'] is not None:
+            self.send_header('ETag', options['etag'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        cut_after = options.pop('cut_after', None)
+        if cut_after is not None:
+            self.wfile.write(body[:cut_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.options = {'ranges': True, 'total_in_416': True, 'etag': '"v1"'}
+    server.payload = PAYLOAD
+    server.requests = []
+    server.if_ranges = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/checkpoint.pth'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def write_partial(manager, url, data, validator='"v1"'):
+    part_path = os.path.join(manager.cache_dir, 'partial', url_key(url))
+    with open(part_path, 'wb') as f:
+        f.write(data)
+    if validator is not None:
+        with open(part_path + '.validator', 'w', encoding='utf-8') as f:
+            f.write(validator)
+
+
+def test_fetch_and_cache(server, tmp_path):
+    manager = AssetManager(str(tmp_path / 'cache'), chunk_size=4096)
+    path = manager.fetch(server.url, sha256=DIGEST)
+    assert read(path) == PAYLOAD
+    assert os.path.basename(path) == DIGEST
+    save_path = str(tmp_path / 'out' / 'checkpoint.pth')
+    assert manager.fetch(server.url, save_path=save_path) == save_path
+    assert read(save_path) == PAYLOAD
+    assert len(server.requests) == 1
+
+
+def test_resume_after_interruption(server, tmp_path):
+    server.options['cut_after'] = 100000
+    manager = AssetManager(str(tmp_path / 'cache'), chunk_size=4096, retries=2)
+    assert read(manager.fetch(server.url, sha256=DIGEST)) == PAYLOAD
+    # The second request picks up the bytes already on disk.
+    assert server.requests[0] is None
+    offset = int(re.match(r'bytes=(\d+)-$', server.requests[1]).group(1))
+    assert 0 < offset <= 100000
+    assert server.if_ranges[1] == '"v1"'
+
+
+def test_changed_remote_file_is_downloaded_again(server, tmp_path):
+    manager = AssetManager(str(tmp_path / 'cache'))
+    write_partial(manager, server.url, PAYLOAD[:5000])
+    server.payload = os.urandom(200000)
+    server.options['etag'] = '"v2"'
+    # If-Range "v1" no longer matches, so the server sends the new file whole.
+    assert read(manager.fetch(server.url)) == server.payload
+    assert server.requests == ['bytes=5000-']
+
+
+def test_partial_without_validator_is_not_resumed(server, tmp_path):
+    manager = AssetManager(str(tmp_path / 'cache'))
+    write_partial(manager, server.url, PAYLOAD[:5000], validator=None)
+    assert read(manager.fetch(server.url, sha256=DIGEST)) == PAYLOAD
+    assert server.requests == [None]
+
+
+def test_no_etag_is_not_resumed(server, tmp_path):
+    server.options['etag'] = None
+    server.options['cut_after'] = 100000
+    manager = AssetManager(str(tmp_path / 'cache'), retries=2)
+    assert read(manager.fetch(server.url, sha256=DIGEST)) == PAYLOAD
+    assert server.requests == [None, None]
+
+
+def test_resume_without_range_support(server, tmp_path):
+    server.options['ranges'] = False
+    manager = AssetManager(str(tmp_path / 'cache'))
+    write_partial(manager, server.url, PAYLOAD[:5000])
+    assert read(manager.fetch(server.url, sha256=DIGEST)) == PAYLOAD
+
+
+def test_complete_partial_is_accepted(server, tmp_path):
+    manager = AssetManager(str(tmp_path / 'cache'))
+    write_partial(manager, server.url, PAYLOAD)
+    assert read(manager.fetch(server.url, sha256=DIGEST)) == PAYLOAD
+    assert server.requests == [f'bytes={len(PAYLOAD)}-']
+
+
+@pytest.mark.parametrize('total_in_416', [True, False])
+def test_oversized_partial_is_downloaded_again(server, tmp_path, total_in_416):
+    server.options['total_in_416'] = total_in_416
+    manager = AssetManager(str(tmp_path / 'cache'))
+    write_partial(manager, server.url, PAYLOAD + b'garbage')
+    assert read(manager.fetch(server.url)) == PAYLOAD
+    assert server.requests == [f'bytes={len(PAYLOAD) + 7}-', None]
+
+
+def test_corrupt_complete_partial_fails_checksum(server, tmp_path):
+    manager = AssetManager(str(tmp_path / 'cache'))
+    corrupt = bytes([PAYLOAD[0] ^ 1]) + PAYLOAD[1:]
+    write_partial(manager, server.url, corrupt)
+    with pytest.raises(ChecksumError):
+        manager.fetch(server.url, sha256=DIGEST)
+    # The bad partial file is dropped, so the next attempt starts from scratch.
+    assert read(manager.fetch(server.url, sha256=DIGEST)) == PAYLOAD
+
+
+def test_checksum_mismatch(server, tmp_path):
+    manager = AssetManager(str(tmp_path / 'cache'))
+    with pytest.raises(ChecksumError):
+        manager.fetch(server.url, sha256='0' * 64)
+    assert manager.cached(server.url) is None
+    assert [name for name in os.listdir(os.path.join(manager.cache_dir, 'partial'))
+            if not name.endswith('.lock')] == []
+
+
+def test_fetch_many(server, tmp_path):
+    manager = AssetManager(str(tmp_path / 'cache'))
+    urls = [f'{server.url}?{i}' for i in range(4)]
+    paths = manager.fetch_many([(url, str(tmp_path / f'{i}.pth')) for i, url in enumerate(urls)])
+    assert paths == [str(tmp_path / f'{i}.pth') for i in range(4)]
+    assert all(read(path) == PAYLOAD for path in paths)
+
+
+def _fetch_in_process(cache_dir, url, results):
+    manager = AssetManager(cache_dir, chunk_size=4096)
+    results.put(read(manager.fetch(url, sha256=DIGEST)) == PAYLOAD)
+
+
+def test_processes_share_one_download(server, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_fetch_in_process, args=(cache_dir, server.url, results)) for _ in range(3)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(30)
+    assert [results.get(timeout=5) for _ in processes] == [True] * 3
+    # The lock keeps the others waiting until the first has finished, and they then find it cached.
+    assert server.requests == [None]
@@ -0,0 +1,36 @@
+import pytest
+
+from openvoice.text import cleaners
+
+
+@pytest.fixture
+def registered():
+    saved = dict(cleaners.language_converters)
+    yield cleaners.register_language
+    cleaners.language_converters.clear()
+    cleaners.language_converters.update(saved)
+
+
+def test_registered_language_is_applied(registered):
+    registered('XX', lambda text: text.upper())
+    assert cleaners.cjke_cleaners2('[XX]hello there[XX]') == 'HELLO THERE.'
+
+
+def test_registered_language_from_module_path(registered):
+    registered('YY', 'string:capwords')
+    assert cleaners.cjke_cleaners2('[YY]hello there[YY]') == 'Hello There.'
+    # resolved once, then kept as the callable
+    assert callable(cleaners.language_converters['YY'])
+
+
+def test_registered_languages_run_after_builtin_marks(registered):
+    calls = []
+    registered('EN', lambda text: calls.append('EN') or text)
+    registered('XX', lambda text: calls.append('XX') or text)
+    cleaners.cjke_cleaners2('[XX]b[XX] [EN]a[EN]')
+    assert calls == ['EN', 'XX']
+
+
+def test_unregistered_mark_raises():
+    with pytest.raises(Exception, match='JA'):
+        cleaners.cjke_cleaners2('[JA]konnichiwa[JA]')
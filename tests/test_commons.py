@@ -0,0 +1,22 @@
+import torch
+
+from openvoice import commons
+
+
+def test_parallel_map_carries_grad_and_autocast_modes():
+    def modes(_):
+        return (torch.is_grad_enabled(),) + commons._autocast_state('cpu')
+
+    with torch.no_grad(), torch.autocast('cpu', dtype=torch.bfloat16):
+        assert commons.parallel_map(modes, range(4), 2) == [(False, True, torch.bfloat16)] * 4
+    assert commons.parallel_map(modes, range(4), 2)[0][:2] == (True, False)
+
+
+def test_per_row():
+    x = torch.zeros(3, 2, 5, dtype=torch.bfloat16)
+    speeds = torch.tensor([1 / 1.1, 1.0, 1 / 0.9], dtype=torch.float64)
+    assert commons.per_row(0.5, x) == 0.5
+    assert commons.per_row(speeds, x).dtype == torch.bfloat16
+    rows = commons.per_row(speeds, x, dtype=torch.float32)
+    assert rows.shape == (3, 1, 1)
+    torch.testing.assert_close(rows.view(-1), speeds.float())
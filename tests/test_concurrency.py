@@ -0,0 +1,72 @@
+"""One shared model instance driven from a thread pool gives the same results as serial calls."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import torch
+
+from openvoice import mel_processing
+from openvoice.api import BaseSpeakerTTS, ToneColorConverter
+
+TEXTS = [
+    'The 3rd train leaves at 10:45, platform 2.',
+    'We paid $12.50 for 1,200 sheets of paper.',
+    'In 2007 the team won 21 of its 30 games.',
+    'Hello there, how are you today?',
+]
+
+# Kernels may pick other code paths when threads compete, so results are
+# compared to a tolerance far below anything a race would produce.
+ATOL = 1e-5
+
+
+def run_concurrently(fn, jobs, max_workers=8, rounds=3):
+    """fn(*job) for every job, repeated rounds times, interleaved on a thread pool."""
+    with ThreadPoolExecutor(max_workers) as pool:
+        futures = [pool.submit(fn, *job) for _ in range(rounds) for job in jobs]
+        results = [future.result(timeout=600) for future in futures]
+    return [results[i::len(jobs)] for i in range(len(jobs))]
+
+
+@pytest.fixture
+def empty_caches():
+    # Make the threads race to fill the window and mel caches.
+    mel_processing.hann_window.clear()
+    mel_processing.mel_basis.clear()
+    mel_processing.conv_stft.clear()
+
+
+def test_shared_tts(tts_config, empty_caches):
+    torch.manual_seed(0)
+    tts = BaseSpeakerTTS(tts_config, device='cpu')
+    jobs = [(text, speaker, seed) for seed, (text, speaker) in
+            enumerate((text, speaker) for text in TEXTS for speaker in ('default', 'whispering'))]
+
+    def synthesize(text, speaker, seed):
+        return tts.tts(text, None, speaker, seed=seed)
+
+    serial = [synthesize(*job) for job in jobs]
+    for expected, results in zip(serial, run_concurrently(synthesize, jobs)):
+        for audio in results:
+            np.testing.assert_allclose(audio, expected, rtol=0, atol=ATOL)
+
+
+@pytest.mark.parametrize('spec_backend', ['stft', 'conv'])
+def test_shared_converter(converter_config, empty_caches, spec_backend):
+    torch.manual_seed(0)
+    converter = ToneColorConverter(converter_config, device='cpu', enable_watermark=False,
+                                   spec_backend=spec_backend)
+    rng = np.random.default_rng(0)
+    sources = [rng.uniform(-0.3, 0.3, n).astype(np.float32) for n in (11025, 22050, 30000)]
+    tgt_se = converter.extract_se(sources[1:])
+
+    def convert(k):
+        src_se = converter.extract_se([sources[k % len(sources)]])
+        return src_se, converter.convert(sources[k % len(sources)], src_se, tgt_se, seed=k)
+
+    jobs = [(k,) for k in range(6)]
+    serial = [convert(*job) for job in jobs]
+    for (expected_se, expected), results in zip(serial, run_concurrently(convert, jobs)):
+        for se, audio in results:
+            torch.testing.assert_close(se, expected_se, rtol=0, atol=ATOL)
+            np.testing.assert_allclose(audio, expected, rtol=0, atol=ATOL)
@@ -0,0 +1,77 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile
+
+from openvoice.encoders import AudioStreamEncoder, encode_audio, encode_chunks, write_chunks
+
+SR = 22050
+
+
+def chunks(seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(-0.5, 0.5, n).astype(np.float32) for n in (1000, 4096, 17, 3000)]
+
+
+def pcm16(audio):
+    return np.clip(np.rint(audio * 32767.), -32768, 32767).astype(np.int16)
+
+
+def assert_decodes_to(data, audio, format):
+    decoded, sr = soundfile.read(io.BytesIO(data), dtype='int16')
+    assert sr == SR
+    # libsndfile scales FLAC input by 32768 rather than 32767
+    tolerance = 1 if format == 'flac' else 0
+    np.testing.assert_allclose(decoded.astype(np.int32), pcm16(audio).astype(np.int32), rtol=0, atol=tolerance)
+
+
+@pytest.mark.parametrize('format', ['wav', 'flac'])
+def test_encode_audio_round_trip(format):
+    audio = np.concatenate(chunks())
+    assert_decodes_to(encode_audio(audio, SR, format), audio, format)
+
+
+def test_pcm16_stream_matches_whole():
+    parts = chunks()
+    stream = b''.join(encode_chunks(parts, SR, 'pcm16'))
+    assert stream == pcm16(np.concatenate(parts)).tobytes()
+
+
+def test_streamed_wav_matches_finalized_samples():
+    parts = chunks()
+    stream = b''.join(encode_chunks(parts, SR, 'wav'))
+    assert stream[44:] == pcm16(np.concatenate(parts)).tobytes()
+
+
+@pytest.mark.parametrize('format', ['wav', 'flac'])
+def test_write_chunks_after_existing_data(format):
+    # e.g. an archive or a container that already holds other bytes
+    prefix = b'other data' * 10
+    f = io.BytesIO()
+    f.write(prefix)
+    written = write_chunks(chunks(), f, SR, format)
+    data = f.getvalue()
+    assert data[:len(prefix)] == prefix
+    assert len(data) == len(prefix) + written
+    assert_decodes_to(data[len(prefix):], np.concatenate(chunks()), format)
+
+
+def test_wav_header_sizes():
+    f = io.BytesIO(b'x' * 7)
+    f.seek(7)
+    written = write_chunks(chunks(), f, SR, 'wav')
+    header = f.getvalue()[7:51]
+    riff_size = int.from_bytes(header[4:8], 'little')
+    data_size = int.from_bytes(header[40:44], 'little')
+    assert (riff_size, data_size) == (written - 8, written - 44)
+
+
+def test_flac_stream_matches_file():
+    # Only STREAMINFO differs: the streamed header says "length unknown".
+    parts = chunks()
+    encoder = AudioStreamEncoder(SR, format='flac')
+    stream = b''.join(bytes(encoder.write(c)) for c in parts) + bytes(encoder.close())
+    complete = encode_audio(np.concatenate(parts), SR, 'flac')
+    assert len(stream) == len(complete)
+    assert stream[:8] == complete[:8] and stream[42:] == complete[42:]
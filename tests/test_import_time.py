@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+# Milliseconds `import openvoice.api` may take on top of torch and numpy.
+IMPORT_BUDGET_MS = float(os.environ.get('OPENVOICE_IMPORT_BUDGET_MS', 500))
+
+# Loaded by the code paths that need them, never at import.
+DEFERRED_MODULES = ['librosa', 'scipy', 'soundfile', 'requests', 'jieba', 'pypinyin', 'cn2an', 'inflect',
+                    'eng_to_ipa', 'faster_whisper', 'whisper_timestamped', 'wavmark']
+
+
+def run_importtime(code):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, us, name = line.split('|')
+        cumulative.setdefault(name.strip(), int(us))
+    return cumulative, result.stdout
+
+
+def test_import_time_budget():
+    # torch and numpy are imported first, so what remains is openvoice's own cost.
+    cumulative, _ = run_importtime('import torch, numpy; import openvoice.api, openvoice.se_extractor')
+    ms = (cumulative['openvoice.api'] + cumulative['openvoice.se_extractor']) / 1000
+    assert ms < IMPORT_BUDGET_MS, f'importing openvoice.api took {ms:.0f} ms, budget {IMPORT_BUDGET_MS:.0f} ms'
+
+
+def test_heavy_dependencies_are_deferred():
+    code = ('import sys, openvoice.api, openvoice.se_extractor; '
+            f'print(" ".join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))')
+    _, stdout = run_importtime(code)
+    assert stdout.split() == []
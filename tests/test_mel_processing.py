@@ -0,0 +1,80 @@
+import pytest
+import torch
+
+from openvoice.mel_processing import ConvSTFT, spectrogram_torch, spectrogram_torch_batch
+
+N_FFT, HOP, WIN, SR = 1024, 256, 1024, 22050
+
+
+def waveform(n=SR, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    return 0.1 * torch.randn(1, n, generator=generator)
+
+
+def test_conv_stft_matches_spectrogram_torch():
+    y = waveform()
+    expected = spectrogram_torch(y, N_FFT, SR, HOP, WIN)
+    spec = ConvSTFT(N_FFT, HOP, WIN)(y)
+    assert spec.shape == expected.shape
+    torch.testing.assert_close(spec, expected, rtol=1e-4, atol=1e-4)
+
+
+def test_conv_stft_matches_torch_stft():
+    y = waveform(8000)
+    stft = ConvSTFT(N_FFT, HOP, WIN)
+    spec = torch.stft(y, N_FFT, hop_length=HOP, win_length=WIN, window=torch.hann_window(WIN),
+                      center=False, return_complex=True)
+    expected = torch.sqrt(spec.abs().square() + 1e-6)
+    torch.testing.assert_close(stft.magnitude(y), expected, rtol=1e-4, atol=1e-4)
+
+
+def test_conv_stft_batch_matches_items():
+    waves = [waveform(n, seed=n)[0] for n in (4000, 9000, 6500)]
+    stft = ConvSTFT(N_FFT, HOP, WIN)
+    spec, spec_lengths, _ = spectrogram_torch_batch(waves, None, N_FFT, SR, HOP, WIN, stft=stft)
+    for i, w in enumerate(waves):
+        expected = spectrogram_torch(w[None], N_FFT, SR, HOP, WIN)[0]
+        assert int(spec_lengths[i]) == expected.size(-1)
+        torch.testing.assert_close(spec[i, :, : expected.size(-1)], expected, rtol=1e-4, atol=1e-4)
+
+
+def test_conv_stft_stays_fp32_under_autocast():
+    y = waveform()
+    stft = ConvSTFT(N_FFT, HOP, WIN)
+    expected = stft(y)
+    with torch.autocast('cpu', dtype=torch.bfloat16):
+        spec = stft(y)
+    assert spec.dtype == torch.float32
+    torch.testing.assert_close(spec, expected)
+
+
+def test_conv_stft_torchscript():
+    y = waveform()
+    stft = ConvSTFT(N_FFT, HOP, WIN)
+    expected = stft(y)
+    torch.testing.assert_close(torch.jit.script(stft)(y), expected)
+    torch.testing.assert_close(torch.jit.trace(stft, (y,))(y), expected)
+
+
+def export_onnx(stft, y, path):
+    pytest.importorskip('onnxscript')
+    torch.onnx.export(stft, (y,), path, input_names=['y'], output_names=['spec'])
+    return path
+
+
+def test_conv_stft_onnx_export(tmp_path):
+    onnx = pytest.importorskip('onnx')
+    model = onnx.load(export_onnx(ConvSTFT(N_FFT, HOP, WIN).eval(), waveform(), str(tmp_path / 'stft.onnx')))
+    onnx.checker.check_model(model)
+    op_types = {node.op_type for node in model.graph.node}
+    assert 'Conv' in op_types
+    assert not op_types & {'STFT', 'DFT'}
+
+
+def test_conv_stft_onnx_runtime(tmp_path):
+    ort = pytest.importorskip('onnxruntime')
+    y = waveform()
+    stft = ConvSTFT(N_FFT, HOP, WIN).eval()
+    session = ort.InferenceSession(export_onnx(stft, y, str(tmp_path / 'stft.onnx')))
+    (spec,) = session.run(None, {'y': y.numpy()})
+    torch.testing.assert_close(torch.from_numpy(spec), stft(y), rtol=1e-4, atol=1e-4)
@@ -0,0 +1,46 @@
+import pytest
+import torch
+
+from openvoice.api import ToneColorConverter
+from openvoice.registry import ModelRegistry, resident_bytes
+
+
+def module_bytes(module):
+    return sum(t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers()))
+
+
+def test_resident_bytes_counts_every_module(converter_config):
+    converter = ToneColorConverter(converter_config, device='cpu', enable_watermark=False, spec_backend='conv')
+    converter.watermark_model = torch.nn.Linear(1000, 1000)
+    expected = module_bytes(converter.model) + module_bytes(converter.watermark_model) \
+        + module_bytes(converter.conv_stft)
+    assert resident_bytes(converter) == expected
+
+
+def test_resident_bytes_counts_shared_tensors_once():
+    a = torch.nn.Linear(10, 10)
+    holder = type('Holder', (object,), {})()
+    holder.model, holder.head, holder.alias = a, torch.nn.Sequential(a), a
+    assert resident_bytes(holder) == module_bytes(a)
+    assert resident_bytes(torch.zeros(4, 8)) == 128
+
+
+def test_eviction_uses_resident_bytes():
+    registry = ModelRegistry(max_bytes=2 * 4 * 1000)
+    for name in ('a', 'b', 'c'):
+        registry.get(name, lambda: torch.zeros(1000))
+    assert list(registry.entries) == ['b', 'c']
+    assert registry.total_bytes == 2 * 4 * 1000
+    assert registry.stats['evictions'] == 1
+
+
+def test_failed_load_leaves_no_lock_behind():
+    registry = ModelRegistry()
+
+    def fail():
+        raise IOError('checkpoint missing')
+
+    with pytest.raises(IOError):
+        registry.get('a', fail)
+    assert registry._load_locks == {}
+    assert registry.get('a', lambda: torch.zeros(4)).shape == (4,)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+import torch
+
+from openvoice.api import BaseSpeakerTTS
+from openvoice.response_cache import ResponseCache
+
+TEXT = 'Room  №5 is open.'
+# What NFKC and collapsing whitespace make of TEXT; the text front end reads № differently
+NORMALIZED = 'Room No5 is open.'
+
+
+@pytest.fixture(scope='module')
+def tts(tts_config):
+    torch.manual_seed(0)
+    return BaseSpeakerTTS(tts_config, device='cpu')
+
+
+def test_cache_does_not_change_the_audio(tts, tmp_path):
+    expected = tts.tts(TEXT, None, 'default', seed=3)
+    tts.response_cache = ResponseCache(cache_dir=str(tmp_path))
+    try:
+        np.testing.assert_array_equal(tts.tts(TEXT, None, 'default', seed=3), expected)
+        np.testing.assert_array_equal(tts.tts(TEXT, None, 'default', seed=3), expected)
+        assert tts.response_cache.stats['memory_hits'] == 1
+        # synthesizes differently, so it must not be served TEXT's audio
+        normalized = tts.tts(NORMALIZED, None, 'default', seed=3)
+        assert normalized.shape != expected.shape or not np.array_equal(normalized, expected)
+        assert tts.response_cache.stats['misses'] == 2
+        # a different seed is a different response
+        tts.tts(TEXT, None, 'default', seed=4)
+        assert tts.response_cache.stats['misses'] == 3
+    finally:
+        tts.response_cache = None
+
+
+def test_unseeded_requests_are_not_cached(tts):
+    tts.response_cache = ResponseCache()
+    try:
+        tts.tts(TEXT, None, 'default')
+        assert tts.response_cache.stats == {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+    finally:
+        tts.response_cache = None
+
+
+def test_disk_tier(tmp_path):
+    audio = np.arange(10, dtype=np.float32)
+    ResponseCache(cache_dir=str(tmp_path)).put('k' * 64, audio)
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(cache.get('k' * 64), audio)
+    assert cache.stats['disk_hits'] == 1
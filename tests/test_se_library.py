@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from openvoice.se_library import SpeakerEmbeddingLibrary
+
+DIM = 16
+
+
+def embeddings(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / 'voices')
+
+
+def test_add_get_and_reopen(root):
+    library = SpeakerEmbeddingLibrary(root, dim=DIM)
+    e = embeddings(3)
+    assert library.add(['a', 'b', 'c'], e) == ['a', 'b', 'c']
+    se = library.get(['c', 'a'])
+    assert se.shape == (2, DIM, 1) and se.dtype == torch.float32
+    np.testing.assert_array_equal(se[..., 0].numpy(), e[[2, 0]])
+
+    reopened = SpeakerEmbeddingLibrary(root)
+    assert reopened.ids == ['a', 'b', 'c']
+    np.testing.assert_array_equal(reopened.get('b')[..., 0].numpy(), e[[1]])
+
+
+def test_add_replaces_existing_id(root):
+    library = SpeakerEmbeddingLibrary(root, dim=DIM)
+    e = embeddings(2)
+    library.add('a', e[0])
+    library.add('a', e[1])
+    assert len(library) == 1
+    np.testing.assert_array_equal(library.get('a')[0, :, 0].numpy(), e[1])
+
+
+def test_dedupe(root):
+    library = SpeakerEmbeddingLibrary(root, dim=DIM)
+    e = embeddings(2)
+    library.add('a', e[0])
+    assert library.add(['a2', 'b'], np.stack([e[0] * 2, e[1]]), dedupe_threshold=0.99) == ['a', 'b']
+    assert sorted(library.ids) == ['a', 'b']
+
+
+def test_remove_and_compact(root):
+    library = SpeakerEmbeddingLibrary(root, dim=DIM)
+    e = embeddings(4)
+    library.add(['a', 'b', 'c', 'd'], e)
+    library.remove(['b', 'missing'])
+    assert 'b' not in library and len(library) == 3
+    assert 'b' not in SpeakerEmbeddingLibrary(root).ids
+
+    library.compact()
+    assert os.path.getsize(os.path.join(root, 'embeddings.bin')) == 3 * DIM * 4
+    reopened = SpeakerEmbeddingLibrary(root)
+    assert reopened.ids == ['a', 'c', 'd']
+    np.testing.assert_array_equal(reopened.get(['a', 'c', 'd'])[..., 0].numpy(), e[[0, 2, 3]])
+
+
+def test_search(root):
+    library = SpeakerEmbeddingLibrary(root, dim=DIM, dtype='float16')
+    e = embeddings(50)
+    library.add([f'v{i}' for i in range(50)], e)
+    library.remove('v7')
+    queries = e[[3, 7]] + 0.01 * embeddings(2, seed=1)
+    results = library.search(torch.from_numpy(queries).unsqueeze(-1), k=3)
+    assert results[0][0][0] == 'v3'
+    assert all(speaker_id != 'v7' for speaker_id, _ in results[1])
+    normalized = e / np.linalg.norm(e, axis=1, keepdims=True)
+    expected = normalized @ (queries[0] / np.linalg.norm(queries[0]))
+    for speaker_id, score in results[0]:
+        assert score == pytest.approx(expected[int(speaker_id[1:])], abs=2e-3)
+    assert [s for _, s in results[0]] == sorted((s for _, s in results[0]), reverse=True)
+
+
+def append(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize('leftover', [
+    ('embeddings.bin', embeddings(1, seed=9).tobytes()),        # row written, id not
+    ('embeddings.bin', embeddings(1, seed=9).tobytes()[:10]),   # partial row
+    ('ids.txt', b'orphan\n'),                                   # id written, row not
+    ('ids.txt', b'orph'),                                       # partial id
+])
+def test_crash_recovery(root, leftover):
+    library = SpeakerEmbeddingLibrary(root, dim=DIM)
+    e = embeddings(3)
+    library.add(['a', 'b'], e[:2])
+    append(os.path.join(root, leftover[0]), leftover[1])
+
+    library = SpeakerEmbeddingLibrary(root)
+    assert library.ids == ['a', 'b']
+    library.add('c', e[2])
+    np.testing.assert_array_equal(library.get(['a', 'b', 'c'])[..., 0].numpy(), e)
+    reopened = SpeakerEmbeddingLibrary(root)
+    assert reopened.ids == ['a', 'b', 'c']
+    np.testing.assert_array_equal(reopened.get('c')[0, :, 0].numpy(), e[2])
@@ -0,0 +1,22 @@
+import pytest
+import torch
+
+from openvoice.api import BaseSpeakerTTS, OpenVoiceBaseClass, ToneColorConverter
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'bfloat16'])
+def test_tts_warmup(tts_config, dtype):
+    torch.manual_seed(0)
+    tts = BaseSpeakerTTS(tts_config, device='cpu', dtype=dtype)
+    assert tts.warmup(lengths=(8, 16)) >= 0
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'bfloat16'])
+def test_converter_warmup(converter_config, dtype):
+    torch.manual_seed(0)
+    converter = ToneColorConverter(converter_config, device='cpu', enable_watermark=False, dtype=dtype)
+    assert converter.warmup(lengths=(16, 32)) >= 0
+
+
+def test_base_class_warmup_is_a_no_op(converter_config):
+    assert OpenVoiceBaseClass(converter_config, device='cpu').warmup() >= 0
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import soundfile
+
+from openvoice import utils
+from openvoice.api import ToneColorConverter
+
+
+class FakeWatermarkModel(object):
+    """
+    Deterministic stand-in for wavmark: encode writes the 32 message bits
+    into the first 32 samples of each chunk, decode reads them back.
+    """
+
+    def __init__(self):
+        self.encode_shapes = []
+        self.decode_shapes = []
+
+    def encode(self, signal, message):
+        self.encode_shapes.append(tuple(signal.shape))
+        out = signal.clone()
+        out[:, :32] = message
+        return out
+
+    def decode(self, signal):
+        self.decode_shapes.append(tuple(signal.shape))
+        return signal[:, :32]
+
+
+@pytest.fixture(scope='module')
+def converter(converter_config):
+    converter = ToneColorConverter(converter_config, device='cpu', enable_watermark=False)
+    converter.watermark_model = FakeWatermarkModel()
+    return converter
+
+
+def reference_string_to_bits(string, pad_len=8):
+    codes = [ord(c) for c in string[:pad_len]] + [0b00100000] * max(0, pad_len - len(string))
+    return np.array([[int(b) for b in bin(c)[2:].zfill(8)] for c in codes])
+
+
+@pytest.mark.parametrize('string', ['', 'ab', '@MyShell', 'longer than eight'])
+def test_string_bits_round_trip(string):
+    bits = utils.string_to_bits(string)
+    assert bits.shape == (8, 8)
+    np.testing.assert_array_equal(bits, reference_string_to_bits(string))
+    assert utils.bits_to_string(bits) == string[:8].ljust(8)
+
+
+def test_bits_to_string_accepts_flat_bits():
+    bits = utils.string_to_bits('@MyShell').reshape(-1)
+    assert utils.bits_to_string(bits) == '@MyShell'
+
+
+def test_watermark_round_trip(converter):
+    model = converter.watermark_model
+    K = converter.watermark_chunk
+    audio = np.random.default_rng(0).uniform(-0.1, 0.1, 3 * K).astype(np.float32)
+    original = audio.copy()
+
+    del model.encode_shapes[:]
+    marked = converter.add_watermark(audio, '@MyShell')
+    # 64 bits: one batched encode of two 32-bit chunks
+    assert model.encode_shapes == [(2, K)]
+
+    index = converter.watermark_chunk_index(len(original), 2)
+    untouched = np.ones(len(original), dtype=bool)
+    untouched[index[:, :32].reshape(-1)] = False
+    np.testing.assert_array_equal(marked[untouched], original[untouched])
+
+    del model.decode_shapes[:]
+    assert converter.detect_watermark(marked, 2) == '@MyShell'
+    assert model.decode_shapes == [(2, K)]
+
+
+def test_watermark_too_short(converter):
+    audio = np.zeros(converter.watermark_chunk, dtype=np.float32)
+    assert converter.detect_watermark(audio, 2) == 'Fail'
+
+
+def test_detect_watermark_many(converter, tmp_path):
+    K = converter.watermark_chunk
+    sr = converter.hps.data.sampling_rate
+    expected = {}
+    for i, message in enumerate(['@MyShell', 'abcdefgh', 'x']):
+        audio = converter.add_watermark(np.zeros(3 * K, dtype=np.float32), message)
+        path = str(tmp_path / f'{i}.wav')
+        soundfile.write(path, audio, sr, subtype='FLOAT')
+        expected[path] = message.ljust(8)
+    assert converter.detect_watermark_many(str(tmp_path), 2, max_workers=2) == expected
+    paths = sorted(expected)[:2]
+    assert converter.detect_watermark_many(paths, 2) == {p: expected[p] for p in paths}
@@ -0,0 +1,80 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+import torch
+
+from openvoice.api import ToneColorConverter
+from openvoice.workers import WorkerPool, freeze_model
+
+
+class Toy(object):
+    def __init__(self):
+        self.model = torch.nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.model(x)
+
+    def fail(self):
+        raise ValueError('bad input')
+
+    def unpicklable(self):
+        return lambda: None
+
+    def crash(self):
+        os._exit(3)
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool({'toy': Toy()}, num_workers=2, num_threads=1, poll_interval=0.1)
+    yield pool
+    pool.close()
+
+
+def test_results_match_in_process(pool):
+    toy = pool.models['toy']
+    xs = [torch.randn(3, 4) for _ in range(6)]
+    outputs = pool.map('toy', 'forward', [(x,) for x in xs])
+    for x, out in zip(xs, outputs):
+        torch.testing.assert_close(out, toy.forward(x))
+
+
+def test_task_errors_reach_the_caller(pool):
+    with pytest.raises(RuntimeError, match='bad input'):
+        pool.submit('toy', 'fail').result(timeout=30)
+    with pytest.raises(Exception):
+        pool.submit('toy', 'unpicklable').result(timeout=30)
+    # the workers are still usable
+    assert pool.submit('toy', 'forward', torch.zeros(1, 4)).result(timeout=30).shape == (1, 4)
+
+
+def test_dead_worker_fails_pending_futures(pool):
+    future = pool.submit('toy', 'crash')
+    with pytest.raises(BrokenProcessPool):
+        future.result(timeout=30)
+    with pytest.raises(BrokenProcessPool):
+        pool.submit('toy', 'forward', torch.zeros(1, 4))
+
+
+def test_shared_converter(converter_config):
+    torch.manual_seed(0)
+    converter = ToneColorConverter(converter_config, device='cpu', enable_watermark=False)
+    audio = np.random.default_rng(0).uniform(-0.1, 0.1, 22050).astype(np.float32)
+    src_se, tgt_se = torch.randn(1, 256, 1), torch.randn(1, 256, 1)
+    with WorkerPool({'converter': converter}, num_workers=2, num_threads=1) as pool:
+        futures = [pool.submit('converter', 'convert', audio, src_se, tgt_se, seed=k) for k in range(3)]
+        outputs = [future.result(timeout=120) for future in futures]
+    for k, out in enumerate(outputs):
+        np.testing.assert_allclose(out, converter.convert(audio, src_se, tgt_se, seed=k), atol=1e-5)
+
+
+def test_frozen_model_refuses_checkpoints(converter_config, tmp_path):
+    converter = ToneColorConverter(converter_config, device='cpu', enable_watermark=False)
+    ckpt_path = str(tmp_path / 'checkpoint.pth')
+    torch.save({'model': converter.model.state_dict()}, ckpt_path)
+    assert any(key.endswith('weight_g') for key in converter.model.state_dict())
+    freeze_model(converter)
+    with pytest.raises(AssertionError, match='frozen'):
+        converter.load_ckpt(ckpt_path)